@@ -0,0 +1,368 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from card_gen import CardBatch, build_packs
+from metrics import RunMetrics
+from seeding import spawn_rngs
+
+PERCENTILES = np.arange(0, 101, 5)
+
+
+class StreamingHistogram:
+    """
+    Fixed bin histogram that is filled one batch at a time.
+
+    Values outside [low, high) are counted as underflow / overflow instead of
+    being binned. Count, mean, sum of squared deviations (M2), min and max are
+    kept alongside. Each batch's mean and M2 are folded in with Chan's parallel
+    update, which stays numerically stable over billions of values, unlike
+    sum / sum of squares.
+
+    Parameters:
+    - low: Left edge of the first bin
+    - high: Right edge of the last bin
+    - bins: Number of equal width bins
+    """
+
+    def __init__(self, low, high, bins):
+        if not high > low or bins < 1:
+            raise ValueError("A histogram needs high > low and at least one bin.")
+
+        self.low = low
+        self.high = high
+        self.bins = bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def edges(self):
+        return np.linspace(self.low, self.high, self.bins + 1)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not len(values):
+            return
+
+        index = np.floor((values - self.low) * (self.bins / (self.high - self.low))).astype(np.int64)
+        inside = (index >= 0) & (index < self.bins)
+        self.counts += np.bincount(index[inside], minlength=self.bins)
+        self.underflow += int(np.count_nonzero(index < 0))
+        self.overflow += int(np.count_nonzero(index >= self.bins))
+
+        batch_mean = float(values.mean())
+        deviations = values - batch_mean
+        self._combine(len(values), batch_mean, float(np.dot(deviations, deviations)))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other):
+        if (other.low, other.high, other.bins) != (self.low, self.high, self.bins):
+            raise ValueError("Only histograms with the same bins can be merged.")
+
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        self._combine(other.count, other._mean, other._m2)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _combine(self, count, mean, m2):
+        # Chan et al.'s pairwise update of count, mean and M2
+        if not count:
+            return
+
+        total = self.count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    @property
+    def mean(self):
+        return self._mean if self.count else None
+
+    @property
+    def std(self):
+        if not self.count:
+            return None
+        return (self._m2 / self.count) ** 0.5
+
+    def to_dict(self):
+        return {
+            "low": self.low,
+            "high": self.high,
+            "counts": self.counts.tolist(),
+            "underflow": self.underflow,
+            "overflow": self.overflow,
+        }
+
+
+class QuantileSketch:
+    """
+    t-digest style quantile sketch.
+
+    Values are buffered, then merged into a few hundred weighted centroids. The
+    centroids are grouped on a log odds scale (t-digest's k2 scale function),
+    so they are small near both tails and wide in the middle, which keeps
+    extreme percentiles accurate. Memory stays around compression / 2
+    centroids plus the buffer, no matter how many values are added.
+
+    Parameters:
+    - compression: Controls the number of centroids kept (higher = more accurate, more memory)
+    - buffer_size: Values held before they are merged into the centroids
+    """
+
+    def __init__(self, compression=500, buffer_size=100_000):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+        self._buffer = []
+        self._buffered = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not len(values):
+            return
+
+        self._buffer.append(values)
+        self._buffered += len(values)
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        if self._buffered >= self.buffer_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+
+        values = np.concatenate(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, np.ones(len(values))]))
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+
+        # Every point goes into the centroid its mid quantile falls in on the k scale,
+        # k(q) = compression / (4 log(n / compression) + 24) * log(q / (1 - q)), one unit of k per centroid
+        total = weights.sum()
+        mid_quantile = (np.cumsum(weights) - weights / 2) / total
+        scale = self.compression / (4 * np.log(max(total / self.compression, 2)) + 24)
+        k = scale * np.log(mid_quantile / (1 - mid_quantile))
+        group = np.floor(k).astype(np.int64)
+        starts = np.flatnonzero(np.diff(group, prepend=group[0] - 1))
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def merge(self, other):
+        self._flush()
+        other._flush()
+        self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """
+        Estimated value at quantile q (a float or array of floats in [0, 1]).
+        """
+        self._flush()
+        if not self.count:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else float("nan")
+
+        # Interpolate between centroid means at their mid quantiles, with the exact min and max at the ends
+        positions = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        xs = np.concatenate([[self.min], self.means, [self.max]])
+        qs = np.concatenate([[0.0], positions, [1.0]])
+        return np.interp(q, qs, xs)
+
+    def percentiles(self, percentiles=PERCENTILES):
+        return self.quantile(np.asarray(percentiles) / 100)
+
+
+class DistributionTracker:
+    """
+    A StreamingHistogram and a QuantileSketch for one stat.
+
+    Parameters:
+    - low, high, bins: Histogram bins, see StreamingHistogram
+    - compression: Sketch accuracy, see QuantileSketch
+    """
+
+    def __init__(self, low, high, bins, compression=500):
+        self.histogram = StreamingHistogram(low, high, bins)
+        self.sketch = QuantileSketch(compression)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.histogram.add(values)
+        self.sketch.add(values)
+
+    def merge(self, other):
+        self.histogram.merge(other.histogram)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def summary(self):
+        histogram = self.histogram
+        return {
+            "count": histogram.count,
+            "mean": histogram.mean,
+            "std": histogram.std,
+            "min": histogram.min if histogram.count else None,
+            "max": histogram.max if histogram.count else None,
+            "percentiles": {str(p): float(v) for p, v in zip(PERCENTILES.tolist(), self.sketch.percentiles())},
+            "histogram": histogram.to_dict(),
+        }
+
+    def plot(self, filename, title="Stat Distribution"):
+        """
+        Write the histogram as a PNG, without pyplot so no display is needed.
+        """
+        histogram = self.histogram
+        edges = histogram.edges
+        widths = np.diff(edges)
+        binned = histogram.counts.sum()
+        density = histogram.counts / (binned * widths) if binned else histogram.counts.astype(np.float64)
+
+        figure = Figure(figsize=(8, 5))
+        FigureCanvasAgg(figure)
+        axes = figure.add_subplot()
+        axes.bar(edges[:-1], density, width=widths, align="edge", alpha=0.75, color="blue", edgecolor="black")
+        axes.set_title(title)
+        axes.set_xlabel("Value")
+        axes.set_ylabel("Density")
+        axes.grid()
+        figure.savefig(filename)
+
+
+# name -> (low, high, bins) of the stats tracked for every card
+CARD_FIELDS = {
+    "health": (0, 300, 30),
+    "primary_attack": (0, 300, 30),
+    "power_rating": (0, 500, 100),
+}
+
+
+class CardAnalytics:
+    """
+    Streaming distributions of card stats, fed one CardBatch at a time.
+
+    Only fixed size histograms, sketches and rarity counts are kept, so any
+    number of cards can go through it. Trackers from separate runs or
+    processes can be combined with merge().
+
+    Parameters:
+    - fields: name -> (low, high, bins) for each CardBatch column to track
+    - compression: Quantile sketch accuracy
+    """
+
+    def __init__(self, fields=None, compression=500):
+        self.fields = dict(fields or CARD_FIELDS)
+        self.trackers = {
+            name: DistributionTracker(low, high, bins, compression) for name, (low, high, bins) in self.fields.items()
+        }
+        self.rarity_labels = None
+        self.rarity_counts = None
+
+    def add_batch(self, batch: CardBatch):
+        for name, tracker in self.trackers.items():
+            tracker.add(getattr(batch, name))
+
+        if self.rarity_labels is None:
+            self.rarity_labels = list(batch.rarity_table.labels)
+            self.rarity_counts = np.zeros(len(self.rarity_labels), dtype=np.int64)
+        self.rarity_counts += np.bincount(batch.rarity_code, minlength=len(self.rarity_labels))
+
+    def merge(self, other):
+        for name, tracker in self.trackers.items():
+            tracker.merge(other.trackers[name])
+
+        if self.rarity_labels is None:
+            self.rarity_labels, self.rarity_counts = other.rarity_labels, other.rarity_counts
+        elif other.rarity_counts is not None:
+            self.rarity_counts += other.rarity_counts
+        return self
+
+    def summary(self):
+        rarity_counts = {}
+        if self.rarity_counts is not None:
+            rarity_counts = dict(zip(self.rarity_labels, self.rarity_counts.tolist()))
+
+        return {
+            "stats": {name: tracker.summary() for name, tracker in self.trackers.items()},
+            "rarity_counts": rarity_counts,
+        }
+
+    def write_report(self, output_dir, name="card_stats"):
+        """
+        Write <name>.json with the summaries and a <name>_<stat>.png histogram per stat.
+
+        Returns:
+        - The summary that was written
+        """
+        os.makedirs(output_dir, exist_ok=True)
+
+        summary = self.summary()
+        with open(os.path.join(output_dir, f"{name}.json"), "w") as file:
+            json.dump(summary, file, indent=2)
+
+        for field, tracker in self.trackers.items():
+            title = f"{field.replace('_', ' ').capitalize()} Distribution"
+            tracker.plot(os.path.join(output_dir, f"{name}_{field}.png"), title)
+
+        return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream simulated packs through the card stat analytics")
+    parser.add_argument("output_dir")
+    parser.add_argument("--packs", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Packs per batch")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    metrics = RunMetrics("analytics", total=args.packs, check_every=1)
+    batches = [args.batch_size] * (args.packs // args.batch_size)
+    if args.packs % args.batch_size:
+        batches.append(args.packs % args.batch_size)
+
+    analytics = CardAnalytics()
+    for rng, packs in zip(spawn_rngs(args.seed, len(batches)), batches):
+        health, attack = build_packs(packs, rng, metrics=metrics)
+        start = time.perf_counter()
+        batch = CardBatch(health.ravel(), attack.ravel(), rng)
+        metrics.add_time("card_batch", time.perf_counter() - start)
+        analytics.add_batch(batch)
+
+    summary = analytics.write_report(args.output_dir)
+    elapsed = metrics.finish()["elapsed"]
+
+    power = summary["stats"]["power_rating"]
+    print(f"{power['count']} cards in {elapsed:.2f}s, power mean {power['mean']:.1f}, median {power['percentiles']['50']:.1f}")
+    print(f"Wrote report to {args.output_dir}")
+    metrics.write_json()
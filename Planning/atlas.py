@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+from card_gen import CARD_SIZE, CardBatch, generate_stats, iter_rendered_cards
+from seeding import make_rng
+
+ATLAS_VERSION = 1
+
+
+class AtlasWriter:
+    """
+    Packs equally sized images into a grid on fixed size sheets. Each sheet is
+    written out as soon as it is full, so only one sheet is held in memory.
+
+    Parameters:
+    - output_dir: Folder the sheets are written to
+    - name: File name prefix for the sheets
+    - cell_size: Size of every image placed on the sheet
+    - sheet_size: Maximum sheet size in pixels
+    - image_format: "png" or "webp"
+    - quality: WebP quality (ignored for PNG)
+    """
+
+    def __init__(self, output_dir, name, cell_size, sheet_size=(4096, 4096), image_format="webp", quality=90):
+        self.output_dir = output_dir
+        self.name = name
+        self.cell_size = cell_size
+        self.image_format = image_format.lower()
+        self.quality = quality
+
+        if self.image_format not in ("png", "webp"):
+            raise ValueError("Invalid atlas format. Choose 'png' or 'webp'.")
+
+        self.columns = sheet_size[0] // cell_size[0]
+        self.rows = sheet_size[1] // cell_size[1]
+        if not self.columns or not self.rows:
+            raise ValueError(f"A {sheet_size} sheet can't fit a {cell_size} card.")
+
+        self.sheets = []
+        self._sheet = None
+        self._placed = 0
+
+    @property
+    def per_sheet(self):
+        return self.columns * self.rows
+
+    def add(self, img):
+        """
+        Place an image on the current sheet. Returns its index entry (sheet, x, y).
+        """
+        if self._sheet is None:
+            width, height = self.cell_size
+            self._sheet = Image.new("RGBA", (self.columns * width, self.rows * height), (0, 0, 0, 0))
+
+        row, column = divmod(self._placed, self.columns)
+        x, y = column * self.cell_size[0], row * self.cell_size[1]
+        self._sheet.paste(img, (x, y))
+        self._placed += 1
+
+        entry = {"sheet": len(self.sheets), "x": x, "y": y}
+        if self._placed == self.per_sheet:
+            self._write_sheet()
+
+        return entry
+
+    def _write_sheet(self):
+        # A partly filled last sheet is cropped to the rows it uses
+        used_rows = -(-self._placed // self.columns)
+        sheet = self._sheet.crop((0, 0, self._sheet.width, used_rows * self.cell_size[1]))
+
+        filename = f"{self.name}_{len(self.sheets):03d}.{self.image_format}"
+        if self.image_format == "webp":
+            sheet.save(os.path.join(self.output_dir, filename), "WEBP", quality=self.quality, method=4)
+        else:
+            sheet.save(os.path.join(self.output_dir, filename), "PNG")
+
+        self.sheets.append(filename)
+        self._sheet = None
+        self._placed = 0
+
+    def close(self):
+        if self._placed:
+            self._write_sheet()
+
+    def index(self):
+        return {"card_size": list(self.cell_size), "sheets": self.sheets}
+
+
+def _unique_cards(cards, seen):
+    for card in cards:
+        if card.unique_card_id not in seen:
+            seen.add(card.unique_card_id)
+            yield card
+
+
+def export_atlases(cards, output_dir, name="cards", sheet_size=(4096, 4096), image_format="webp", quality=90,
+                   thumbnail_scale=None, workers=None):
+    """
+    Render cards straight into texture atlases with a JSON index, instead of one file per card.
+
+    Cards are keyed by unique_card_id in the index, repeated IDs are only rendered once.
+
+    Parameters:
+    - cards: Iterable of Card objects
+    - output_dir: Folder for the sheets and index (created if needed)
+    - name: Prefix for the sheet and index file names
+    - sheet_size: Maximum sheet size in pixels
+    - image_format: "png" or "webp"
+    - quality: WebP quality
+    - thumbnail_scale: If set, also build a thumbnail atlas with cards scaled by this factor
+    - workers: Number of render processes, defaults to the CPU count
+
+    Returns:
+    - The index that was written to <name>.json
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    atlas = AtlasWriter(output_dir, name, CARD_SIZE, sheet_size, image_format, quality)
+    thumbnails = None
+    if thumbnail_scale:
+        thumbnail_size = (round(CARD_SIZE[0] * thumbnail_scale), round(CARD_SIZE[1] * thumbnail_scale))
+        thumbnails = AtlasWriter(output_dir, f"{name}_thumbs", thumbnail_size, sheet_size, image_format, quality)
+
+    index = {"version": ATLAS_VERSION, "format": atlas.image_format, "cards": {}}
+    thumbnail_entries = {}
+
+    for _, card, img in iter_rendered_cards(_unique_cards(cards, set()), workers, encode=None):
+        index["cards"][card.unique_card_id] = atlas.add(img)
+        if thumbnails:
+            thumbnail_entries[card.unique_card_id] = thumbnails.add(img.resize(thumbnails.cell_size, Image.Resampling.BOX))
+
+    atlas.close()
+    index.update(atlas.index())
+
+    if thumbnails:
+        thumbnails.close()
+        index["thumbnails"] = dict(thumbnails.index(), cards=thumbnail_entries)
+
+    with open(os.path.join(output_dir, f"{name}.json"), "w") as file:
+        json.dump(index, file, separators=(",", ":"))
+
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render random cards into texture atlases")
+    parser.add_argument("output_dir")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--format", choices=["png", "webp"], default="webp")
+    parser.add_argument("--sheet-size", type=int, default=4096)
+    parser.add_argument("--thumbnail-scale", type=float, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None, help="Seed for a repeatable set of cards")
+    args = parser.parse_args()
+
+    rng = make_rng(args.seed)
+    stats = np.round(generate_stats(distribution="normal", mean=50, std_dev=32, num_samples=args.count, rng=rng) / 10) * 10
+    stats = stats[stats >= 20]
+    attack = np.round(rng.uniform(stats * 0.3, stats) * 0.8 / 10) * 10
+
+    index = export_atlases(
+        CardBatch(stats, attack, rng),
+        args.output_dir,
+        sheet_size=(args.sheet_size, args.sheet_size),
+        image_format=args.format,
+        thumbnail_scale=args.thumbnail_scale,
+        workers=args.workers,
+    )
+    print(f"Packed {len(index['cards'])} cards into {len(index['sheets'])} sheets in {args.output_dir}")
@@ -0,0 +1,267 @@
+import argparse
+import gc
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from card_gen import Card, CardBatch, build_packs, generate_stats, render_card_image
+from card_ids import card_ids, short_hash_case_insensitive
+from rarity import get_rarity_table
+from seeding import BulkRandom
+from wordtest import PatternTemplate, parse_pattern, patterns, word_lists
+
+# name -> (setup function, default scales)
+BENCHMARKS = {}
+
+
+def benchmark(name, scales):
+    """
+    Register a benchmark. The decorated function takes the item count, does any
+    setup and returns a callable that runs the timed part.
+    """
+    def register(setup):
+        BENCHMARKS[name] = (setup, scales)
+        return setup
+    return register
+
+
+def _sample_cards(count, seed=0):
+    rng = np.random.default_rng(seed)
+    health = np.maximum(np.round(rng.normal(50, 32, count) / 10) * 10, 20)
+    attack = np.round(rng.uniform(health * 0.3, health) * 0.8 / 10) * 10
+    return health.astype(np.int64), attack.astype(np.int64)
+
+
+@benchmark("card_construction", scales=(1_000, 100_000))
+def bench_card_construction(count):
+    health, attack = (column.tolist() for column in _sample_cards(count))
+    rng = np.random.default_rng(0)
+    return lambda: [Card(h, a, rng) for h, a in zip(health, attack)]
+
+
+@benchmark("card_batch", scales=(1_000, 100_000, 10_000_000))
+def bench_card_batch(count):
+    health, attack = _sample_cards(count)
+    return lambda: CardBatch(health, attack, np.random.default_rng(0))
+
+
+@benchmark("card_objects", scales=(1_000, 100_000))
+def bench_card_objects(count):
+    batch = CardBatch(*_sample_cards(count), np.random.default_rng(0))
+    return lambda: [batch.card(index) for index in range(count)]
+
+
+@benchmark("card_views", scales=(1_000, 100_000))
+def bench_card_views(count):
+    batch = CardBatch(*_sample_cards(count), np.random.default_rng(0))
+    return lambda: list(batch)
+
+
+@benchmark("short_hash_case_insensitive", scales=(1_000, 100_000))
+def bench_short_hash(count):
+    health, attack = (column.tolist() for column in _sample_cards(count))
+    return lambda: [short_hash_case_insensitive([h, a, 1, "ENTITY_STANDARD"]) for h, a in zip(health, attack)]
+
+
+@benchmark("card_ids", scales=(1_000, 100_000, 10_000_000))
+def bench_card_ids(count):
+    health, attack = _sample_cards(count)
+    rng = np.random.default_rng(0)
+    seed, card_type = rng.integers(1, 4, count), rng.integers(0, 4, count)
+    return lambda: card_ids(health, attack, seed, card_type)
+
+
+@benchmark("parse_pattern", scales=(1_000, 100_000))
+def bench_parse_pattern(count):
+    rng = BulkRandom(0)
+    chosen = [rng.choice(patterns) for _ in range(count)]
+    return lambda: [parse_pattern(pattern, word_lists, rng) for pattern in chosen]
+
+
+@benchmark("pattern_render", scales=(1_000, 100_000, 1_000_000))
+def bench_pattern_render(count):
+    rng = BulkRandom(0)
+    templates = [PatternTemplate(pattern, word_lists) for pattern in patterns]
+    chosen = [rng.choice(templates) for _ in range(count)]
+    return lambda: [template.render(rng) for template in chosen]
+
+
+@benchmark("generate_stats", scales=(1_000, 100_000, 10_000_000))
+def bench_generate_stats(count):
+    rng = np.random.default_rng(0)
+    return lambda: generate_stats(distribution="normal", mean=50, std_dev=32, num_samples=count, rng=rng)
+
+
+@benchmark("generate_stats_truncated", scales=(1_000, 100_000, 10_000_000))
+def bench_generate_stats_truncated(count):
+    rng = np.random.default_rng(0)
+    return lambda: generate_stats(distribution="normal", mean=50, std_dev=32, num_samples=count, rng=rng, low=15)
+
+
+@benchmark("build_packs", scales=(1_000, 100_000, 1_000_000))
+def bench_build_packs(count):
+    rng = np.random.default_rng(0)
+    return lambda: build_packs(count, rng)
+
+
+@benchmark("rarity_classify", scales=(1_000, 100_000, 10_000_000))
+def bench_rarity_classify(count):
+    health, attack = _sample_cards(count)
+    power = health + 1.2 * attack
+    table = get_rarity_table()
+    return lambda: table.classify(power)
+
+
+@benchmark("generate_card_image", scales=(10, 100))
+def bench_generate_card_image(count):
+    cards = [CardBatch(*_sample_cards(count), np.random.default_rng(0)).card(index) for index in range(count)]
+
+    def run():
+        for card in cards:
+            render_card_image(card).save(io.BytesIO(), format="PNG")
+
+    return run
+
+
+def _time(run, min_time=0.2, max_repeats=5):
+    # Best of a few runs for quick benchmarks, a single run for slow ones
+    best = None
+    for _ in range(max_repeats):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        if elapsed >= min_time:
+            break
+    return best
+
+
+def _measure_memory(run):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = run()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    allocations = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "filename"))
+    del result
+    return peak, allocations
+
+
+def run_benchmarks(names=None, max_scale=None, memory=True):
+    """
+    Run the registered benchmarks.
+
+    Parameters:
+    - names: Benchmarks to run, all of them if None
+    - max_scale: Skip scales above this item count
+    - memory: Also record peak memory and allocation counts (a separate, slower run under tracemalloc)
+
+    Returns:
+    - Dict of benchmark name -> scale -> measurements
+    """
+    results = {}
+    for name, (setup, scales) in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+
+        for scale in scales:
+            if max_scale and scale > max_scale:
+                continue
+
+            run = setup(scale)
+            seconds = _time(run)
+            measurement = {"seconds": seconds, "ops_per_sec": scale / seconds}
+
+            if memory:
+                peak, allocations = _measure_memory(run)
+                measurement.update(peak_bytes=peak, bytes_per_item=peak / scale, allocations=allocations)
+
+            results.setdefault(name, {})[str(scale)] = measurement
+            print(_format_line(name, scale, measurement))
+
+    return results
+
+
+def _format_line(name, scale, measurement):
+    line = f"{name:>28} {scale:>10}: {measurement['ops_per_sec']:>14,.0f} ops/s"
+    if "peak_bytes" in measurement:
+        line += f"  {measurement['peak_bytes'] / 1024 ** 2:>9.1f} MB peak  {measurement['bytes_per_item']:>8.1f} B/item  {measurement['allocations']:>9} allocs"
+    return line
+
+
+def compare_to_baseline(results, baseline, tolerance=0.2):
+    """
+    Check results against a baseline run.
+
+    A benchmark regresses when its ops/sec drops, or its peak memory grows, by
+    more than `tolerance` (a fraction) at any scale both runs have.
+
+    Returns:
+    - List of regression descriptions, empty if there were none
+    """
+    regressions = []
+    for name, scales in results.items():
+        for scale, measurement in scales.items():
+            previous = baseline.get(name, {}).get(scale)
+            if previous is None:
+                continue
+
+            if measurement["ops_per_sec"] < previous["ops_per_sec"] * (1 - tolerance):
+                regressions.append(
+                    f"{name} @ {scale}: {measurement['ops_per_sec']:,.0f} ops/s, baseline {previous['ops_per_sec']:,.0f}"
+                )
+
+            if "peak_bytes" in measurement and "peak_bytes" in previous:
+                if measurement["peak_bytes"] > previous["peak_bytes"] * (1 + tolerance):
+                    regressions.append(
+                        f"{name} @ {scale}: {measurement['peak_bytes']:,} bytes peak, baseline {previous['peak_bytes']:,}"
+                    )
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the Planning generators")
+    parser.add_argument("--only", nargs="*", choices=list(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--max-scale", type=int, default=None, help="Skip scales above this item count")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc memory runs")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to --baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.only, args.max_scale, memory=not args.no_memory)
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline")
@@ -0,0 +1,201 @@
+import json
+import os
+
+import numpy as np
+
+from card_gen import CARD_TYPE_CODES, CARD_TYPES, Card, CardBatch
+from card_ids import decode_base36, encode_base36
+from rarity import get_rarity_table
+
+CARD_DB_VERSION = 1
+
+# Every column is a flat little endian file of fixed width values
+COLUMNS = {
+    "health": "<i2",
+    "primary_attack": "<i2",
+    "secondary_attack": "<i2",
+    "power_rating": "<f4",
+    "rarity": "u1",
+    "card_type": "u1",
+    "card_seed": "u1",
+    "has_ability": "u1",
+    "unique_card_id": "<u4",
+}
+
+
+class CardDatabaseWriter:
+    """
+    Streams cards into a columnar card database.
+
+    A database is a folder with one raw file per column plus a meta.json that
+    records the column types, row count and rarity labels. Batches are appended
+    to the column files as they come in, so nothing bigger than one batch is
+    ever held in memory. IDs are stored as their numeric (uint32) Base36 value.
+
+    Any existing meta.json is removed before the columns are rewritten and the
+    new one only appears, atomically, on close(). Leaving a with block on an
+    exception only closes the column files, so a run that dies part way
+    leaves a folder CardDatabase refuses to open instead of a partial database
+    or new columns with an old row count.
+
+    Parameters:
+    - path: Folder to write the database to (created if needed, existing columns are replaced)
+    - rarity_labels: Labels the stored rarity codes refer to, the active rarity table's by default
+    """
+
+    def __init__(self, path, rarity_labels=None):
+        self.path = path
+        self.rarity_labels = list(rarity_labels or get_rarity_table().labels)
+        self.count = 0
+
+        os.makedirs(path, exist_ok=True)
+        try:
+            os.remove(os.path.join(path, "meta.json"))
+        except FileNotFoundError:
+            pass
+
+        self._files = {name: open(os.path.join(path, f"{name}.bin"), "wb") for name in COLUMNS}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._close_files()
+
+    def write_columns(self, **columns):
+        """
+        Append one batch given as arrays for every column in COLUMNS.
+        """
+        lengths = {len(columns[name]) for name in COLUMNS}
+        if len(lengths) != 1:
+            raise ValueError("All columns in a batch must be the same length.")
+
+        for name, dtype in COLUMNS.items():
+            self._files[name].write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+
+        self.count += lengths.pop()
+
+    def write_batch(self, batch: CardBatch):
+        if batch.rarity_table.labels != self.rarity_labels:
+            raise ValueError("The batch uses different rarity labels to this database.")
+
+        self.write_columns(
+            health=batch.health,
+            primary_attack=batch.primary_attack,
+            secondary_attack=batch.secondary_attack,
+            power_rating=batch.power_rating,
+            rarity=batch.rarity_code,
+            card_type=batch.card_type_code,
+            card_seed=batch.card_seed,
+            has_ability=batch.has_ability,
+            unique_card_id=decode_base36(batch.unique_card_id),
+        )
+
+    def write_cards(self, cards):
+        """
+        Append a list of Card objects.
+        """
+        self.write_columns(
+            health=[card.health for card in cards],
+            primary_attack=[card.primary_attack for card in cards],
+            secondary_attack=[card.secondary_attack for card in cards],
+            power_rating=[card.power_rating for card in cards],
+            rarity=[self.rarity_labels.index(card.rarity) for card in cards],
+            card_type=[CARD_TYPE_CODES[card.card_type] for card in cards],
+            card_seed=[card.card_seed for card in cards],
+            has_ability=[card.has_ability for card in cards],
+            unique_card_id=decode_base36([card.unique_card_id for card in cards]),
+        )
+
+    def _close_files(self):
+        for file in self._files.values():
+            file.close()
+
+    def close(self):
+        """
+        Close the column files and publish meta.json, making the database readable.
+        """
+        self._close_files()
+
+        meta = {
+            "version": CARD_DB_VERSION,
+            "count": self.count,
+            "columns": COLUMNS,
+            "rarity_labels": self.rarity_labels,
+        }
+        meta_path = os.path.join(self.path, "meta.json")
+        temp_path = meta_path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(meta, file, indent=2)
+        os.replace(temp_path, meta_path)
+
+
+class CardDatabase:
+    """
+    Read only, memory mapped view of a columnar card database.
+
+    Each column is a NumPy memmap (db.health, db.power_rating, ...), so queries
+    are plain array operations and only the pages they touch are read from
+    disk. Card objects are only built for rows that are asked for.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"No meta.json in {path}, the database is missing or its writer was never closed.")
+
+        with open(meta_path) as file:
+            meta = json.load(file)
+
+        if meta["version"] != CARD_DB_VERSION:
+            raise ValueError(f"Unsupported card database version {meta['version']}.")
+
+        self.count = meta["count"]
+        self.rarity_labels = meta["rarity_labels"]
+
+        for name, dtype in meta["columns"].items():
+            size = os.path.getsize(os.path.join(path, f"{name}.bin"))
+            if size != self.count * np.dtype(dtype).itemsize:
+                raise ValueError(f"Column {name} doesn't match the {self.count} rows in meta.json.")
+        self.columns = {
+            name: np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=(self.count,))
+            if self.count else np.empty(0, dtype=dtype)
+            for name, dtype in meta["columns"].items()
+        }
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get("columns", {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self.card(index)
+
+    def ids(self, rows=slice(None)):
+        """
+        Card ID strings for the given rows (a slice, index array or mask).
+        """
+        return encode_base36(self.columns["unique_card_id"][rows])
+
+    def card(self, index):
+        columns = self.columns
+        return Card.from_fields(
+            columns["health"][index],
+            columns["primary_attack"][index],
+            columns["power_rating"][index],
+            self.rarity_labels[columns["rarity"][index]],
+            CARD_TYPES[columns["card_type"][index]],
+            columns["card_seed"][index],
+            columns["secondary_attack"][index],
+            columns["has_ability"][index],
+            encode_base36(columns["unique_card_id"][[index]])[0],
+        )
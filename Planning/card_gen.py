@@ -1,48 +1,77 @@
+import io
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 import hashlib
 import base64
-import random
-from typing import List
 import numpy as np
 import matplotlib.pyplot as plt
 from PIL import Image, ImageDraw, ImageFont
+from rarity import get_rarity_table
+from card_ids import card_id, card_ids, card_key, card_keys, encode_base36, short_hash_case_insensitive
+from metrics import RunMetrics
+from render_cache import RenderCache, render_key
+from samplers import empirical_stats, sigmoid_stats, truncated_logistic_stats, truncated_normal_stats
+from seeding import get_default_rng, make_rng
 
 
-def short_hash_case_insensitive(data):
+high_damage_dual_attack_threshold = 70
+ability_base_chance = 0.04
+extreme_health_ability_boost = 0.60
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+def _mix64(z):
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+def card_draws(health, card_seed, count=2):
     """
-    Generate a 6-character case-insensitive alphanumeric hash.
-    
+    Deterministic uniform [0, 1) values for a card.
+
+    A counter based (splitmix64) hash of (health, card_seed) stands in for
+    reseeding a random generator, so no generator state is touched and the same
+    health and seed always give the same values on any thread.
+
     Parameters:
-    - data: Any input (string, number, object that can be converted to a string)
-    
+    - health: Card health
+    - card_seed: The card specific seed (1-3)
+    - count: How many values to return
+
     Returns:
-    - A 6-character uppercase alphanumeric hash (Base36)
+    - List of `count` floats
     """
-    # Ensure data is a string and encode to bytes
-    data_bytes = str(data).encode('utf-8')
-
-    # Create a SHA-256 hash
-    sha256_hash = hashlib.sha256(data_bytes).digest()
+    key = ((int(health) << 8) | int(card_seed)) & _MASK64
+    return [
+        (_mix64((key + _GOLDEN_GAMMA * (i + 1)) & _MASK64) >> 11) * 2.0 ** -53
+        for i in range(count)
+    ]
 
-    # Convert hash to an integer
-    hash_int = int.from_bytes(sha256_hash, 'big')
 
-    # Convert to Base36 (case-insensitive alphanumeric)
-    base36_hash = ''
-    alphabet = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-    
-    # Extract 6 characters from Base36
-    while hash_int and len(base36_hash) < 6:
-        base36_hash = alphabet[hash_int % 36] + base36_hash
-        hash_int //= 36
+def card_draws_array(health, card_seed, count=2):
+    """
+    Array version of card_draws, returns a (len(health), count) array matching it row for row.
+    """
+    key = (np.asarray(health).astype(np.int64) << 8 | np.asarray(card_seed).astype(np.int64)).astype(np.uint64)
 
-    # Pad with leading zeros if necessary
-    return base36_hash.rjust(6, '0')
+    draws = np.empty((len(key), count))
+    for i in range(count):
+        z = key + np.uint64((_GOLDEN_GAMMA * (i + 1)) & _MASK64)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+        draws[:, i] = (z >> np.uint64(11)) * 2.0 ** -53
 
+    return draws
 
-high_damage_dual_attack_threshold = 70
-ability_base_chance = 0.04
-extreme_health_ability_boost = 0.60
 
 class CardType(Enum):
     ENTITY_STANDARD = 1,
@@ -51,147 +80,606 @@ class CardType(Enum):
     UTILITY_ITEM = 4
 
 
-class Card:
+# Stable ordering used for integer type codes (CardBatch columns and card IDs)
+CARD_TYPES = list(CardType)
+CARD_TYPE_CODES = {card_type: code for code, card_type in enumerate(CARD_TYPES)}
+
+class BaseCard:
+    """
+    Behaviour shared by Card and CardView. Subclasses provide the card attributes.
+
+    Two cards are equal when their health, primary attack, seed and type match,
+    since everything else on a card follows from those. card_key packs the four
+    into one integer (see card_ids.card_keys), which is also the hash.
+    """
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if not isinstance(other, BaseCard):
+            return NotImplemented
+        return self.card_key == other.card_key
+
+    def __hash__(self):
+        return self.card_key
+
+    def __str__(self):
+        return f"{self.unique_card_id} [{self.power_rating}] {self.rarity}: Health: {self.health}, Att: {self.primary_attack}, {self.secondary_attack}, Ability: {self.has_ability}"
+
+    def __repr__(self):
+        return self.__str__()
+
+    @staticmethod
+    def categorize_rarity(power_rating):
+        return get_rarity_table().categorize(power_rating)
+
+
+class Card(BaseCard):
+    # Slots instead of a per card __dict__, pack simulations hold millions of these
+    __slots__ = (
+        "health",
+        "primary_attack",
+        "power_rating",
+        "rarity",
+        "has_ability",
+        "secondary_attack",
+        "unique_card_id",
+        "card_type",
+        "card_seed",
+        "card_key",
+    )
+
     health: int
     primary_attack: int
     power_rating: float
-    rarity: str = "Common"
-    has_ability: bool = False
-    secondary_attack: int = 0
+    rarity: str
+    has_ability: bool
+    secondary_attack: int
     unique_card_id: str
-    card_type: CardType = CardType.ENTITY_STANDARD
+    card_type: CardType
+    card_seed: int
+    card_key: int
+
+    def __init__(self, health, primary_attack, rng=None, id_registry=None):
+        # rng is a numpy Generator or a seed, the shared default Generator if None. Draws happen in
+        # the same order as a one row CardBatch, so both give the same card from the same Generator state
+        rng = get_default_rng() if rng is None else make_rng(rng)
 
-    def __init__(self, health, primary_attack):
         self.health = int(health)
         self.primary_attack = primary_attack
+        self.card_type = CardType.ENTITY_STANDARD
+        self.secondary_attack = 0
 
         self.power_rating = health + 1.2 * primary_attack
 
         self.rarity = self.categorize_rarity(self.power_rating)
 
-        if random.random() < 0.33:
-            self.card_type = random.choice([CardType.UTILITY_ABILITY, CardType.UTILITY_BUILDING, CardType.UTILITY_ITEM])
+        is_utility = rng.random() < 0.33
+        utility_type = CARD_TYPES[rng.integers(1, len(CARD_TYPES))]
+        if is_utility:
+            self.card_type = utility_type
 
-        _random_state_backup = random.getstate()
-        card_specific_seed = random.randint(1,3)
-        random.seed(self.health * card_specific_seed)
+        self.card_seed = int(rng.integers(1, 4))
+        secondary_draw, ability_draw = card_draws(self.health, self.card_seed)
 
         if self.primary_attack >= high_damage_dual_attack_threshold:
-            self.secondary_attack = int(round((att * random.uniform(0.25, 0.5))/10)*10)
+            self.secondary_attack = int(round((self.primary_attack * (0.25 + 0.25 * secondary_draw))/10)*10)
 
-            # Probability of an ability slot increases at extreme health values
+        # Probability of an ability slot increases at extreme health values
         health_proximity = abs(self.health - 70) / (100 - 20)
         ability_chance = ability_base_chance + health_proximity * extreme_health_ability_boost
-        self.has_ability = random.random() < ability_chance
+        self.has_ability = ability_draw < ability_chance
+
+        self.card_key = card_key(self.health, self.primary_attack, self.card_seed, CARD_TYPE_CODES[self.card_type])
+        if id_registry is None:
+            self.unique_card_id = card_id(self.health, self.primary_attack, self.card_seed, CARD_TYPE_CODES[self.card_type])
+        else:
+            # Registered ID, salted if the plain one already belongs to another card
+            values, _ = id_registry.register_keys([self.card_key])
+            self.unique_card_id = str(encode_base36(values)[0])
+
+    @classmethod
+    def from_fields(cls, health, primary_attack, power_rating, rarity, card_type, card_seed, secondary_attack,
+                    has_ability, unique_card_id):
+        """
+        Rebuild a card from already worked out fields (e.g. a CardBatch row or a stored card) without re-rolling anything.
+        """
+        card = cls.__new__(cls)
+        card.health = int(health)
+        card.primary_attack = int(primary_attack)
+        card.power_rating = float(power_rating)
+        card.rarity = sys.intern(rarity)
+        card.card_type = card_type
+        card.card_seed = int(card_seed)
+        card.secondary_attack = int(secondary_attack)
+        card.has_ability = bool(has_ability)
+        card.unique_card_id = str(unique_card_id)
+        card.card_key = card_key(card.health, card.primary_attack, card.card_seed, CARD_TYPE_CODES[card_type])
+        return card
+
+
+class CardBatch:
+    """
+    A batch of cards stored as NumPy columns instead of Card objects.
 
+    Follows the same rules as Card.__init__ and uses the same card_draws values,
+    so a row has exactly the same secondary attack and ability as a Card built
+    from the same health, attack, seed and type would have. Card objects are only
+    made when a row is asked for.
 
-        random.setstate(_random_state_backup)
+    Parameters:
+    - health: Array of health values
+    - primary_attack: Array of primary attack values (stored as integers)
+    - rng: numpy Generator or seed for the card type and card seed draws, fresh entropy if None
+    - rarity_table: Optional RarityTable, the active table is used otherwise
+    - id_registry: Optional IdRegistry to issue the IDs through, so colliding cards get their salted IDs
 
-        self.unique_card_id = short_hash_case_insensitive([self.health, self.primary_attack, card_specific_seed, self.card_type])
+    Health and attack are expected to fit in an int16, which any real card does.
+    """
 
-    def __str__(self):
-        return f"{self.unique_card_id} [{self.power_rating}] {self.rarity}: Health: {self.health}, Att: {self.primary_attack}, {self.secondary_attack}, Ability: {self.has_ability}"
+    def __init__(self, health, primary_attack, rng=None, rarity_table=None, id_registry=None):
+        rng = make_rng(rng)
 
-    def __repr__(self):
-        return self.__str__()
-    
-    def __hash__(self):
-        return self.unique_card_id
+        self.rarity_table = rarity_table or get_rarity_table()
 
-    @staticmethod
-    def categorize_rarity(power_rating):
+        self.health = np.asarray(health).astype(np.int64)
+        self.primary_attack = np.asarray(primary_attack).astype(np.int64)
+        count = len(self.health)
 
-        if power_rating >= 200:
-            return "Legendary"
+        self.power_rating = self.health + 1.2 * self.primary_attack
+        self.rarity_code = self.rarity_table.classify(self.power_rating)
 
-        if power_rating >= 170:
-            return "Ultra Rare"
-        
-        if power_rating >= 138:
-            return "Rare"
-        
-        if power_rating >= 106:
-            return "Uncommon"
-        
-        return "Common"
-    
-
-bgs = [
-    (Image.open("./bg/gold.png"), "#eacb5b"),
-    (Image.open("./bg/fire.png"), "#ffc27a"),
-    (Image.open("./bg/plasma.png"), "#262239"),
-    (Image.open("./bg/gem.png"), "#96d497"),
+        is_utility = rng.random(count) < 0.33
+        self.card_type_code = np.where(is_utility, rng.integers(1, len(CARD_TYPES), count), 0).astype(np.uint8)
+        self.card_seed = rng.integers(1, 4, count).astype(np.uint8)
+
+        draws = card_draws_array(self.health, self.card_seed)
+        dual_attack = self.primary_attack >= high_damage_dual_attack_threshold
+
+        secondary = np.round(self.primary_attack * (0.25 + 0.25 * draws[:, 0]) / 10) * 10
+        self.secondary_attack = np.where(dual_attack, secondary, 0).astype(np.int64)
+
+        # Probability of an ability slot increases at extreme health values
+        health_proximity = np.abs(self.health - 70) / (100 - 20)
+        ability_chance = ability_base_chance + health_proximity * extreme_health_ability_boost
+        self.has_ability = draws[:, 1] < ability_chance
+
+        if id_registry is None:
+            self.unique_card_id = card_ids(self.health, self.primary_attack, self.card_seed, self.card_type_code)
+        else:
+            values, _ = id_registry.register_keys(self.card_keys())
+            self.unique_card_id = encode_base36(values)
+
+    @property
+    def rarity(self):
+        return self.rarity_table.labels_for(self.rarity_code)
+
+    def card_keys(self):
+        """
+        The card_key of every row, as a uint64 array.
+        """
+        return card_keys(self.health, self.primary_attack, self.card_seed, self.card_type_code)
+
+    def unique_indices(self):
+        """
+        Row index of the first copy of every distinct card, in row order.
+        """
+        _, first = np.unique(self.card_keys(), return_index=True)
+        return np.sort(first)
+
+    @property
+    def card_type(self):
+        return np.array(CARD_TYPES, dtype=object)[self.card_type_code]
+
+    def __len__(self):
+        return len(self.health)
+
+    def __getitem__(self, index):
+        return CardView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield CardView(self, index)
+
+    def card(self, index):
+        """
+        Build the Card object for one row.
+        """
+        return Card.from_fields(
+            self.health[index],
+            self.primary_attack[index],
+            self.power_rating[index],
+            self.rarity_table.label(self.rarity_code[index]),
+            CARD_TYPES[self.card_type_code[index]],
+            self.card_seed[index],
+            self.secondary_attack[index],
+            self.has_ability[index],
+            self.unique_card_id[index],
+        )
+
+
+class CardView(BaseCard):
+    """
+    Read only view of one CardBatch row that reads like a Card.
+
+    Only holds the batch and row index, so keeping millions of cards around
+    costs a fraction of what Card objects would. Use CardBatch.card() for a
+    standalone Card. Pickling a view pickles just that row, as a Card.
+    """
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: CardBatch, index):
+        self._batch = batch
+        self._index = index
+
+    def __reduce__(self):
+        card = self._batch.card(self._index)
+        return (Card.from_fields, (
+            card.health, card.primary_attack, card.power_rating, card.rarity, card.card_type,
+            card.card_seed, card.secondary_attack, card.has_ability, card.unique_card_id,
+        ))
+
+    @property
+    def health(self):
+        return int(self._batch.health[self._index])
+
+    @property
+    def primary_attack(self):
+        return int(self._batch.primary_attack[self._index])
+
+    @property
+    def power_rating(self):
+        return float(self._batch.power_rating[self._index])
+
+    @property
+    def rarity(self):
+        return self._batch.rarity_table.label(self._batch.rarity_code[self._index])
+
+    @property
+    def has_ability(self):
+        return bool(self._batch.has_ability[self._index])
+
+    @property
+    def secondary_attack(self):
+        return int(self._batch.secondary_attack[self._index])
+
+    @property
+    def unique_card_id(self):
+        return str(self._batch.unique_card_id[self._index])
+
+    @property
+    def card_type(self):
+        return CARD_TYPES[self._batch.card_type_code[self._index]]
+
+    @property
+    def card_seed(self):
+        return int(self._batch.card_seed[self._index])
+
+    @property
+    def card_key(self):
+        batch, index = self._batch, self._index
+        return card_key(batch.health[index], batch.primary_attack[index], batch.card_seed[index], batch.card_type_code[index])
+
+
+CARD_SIZE = (int(300 * 2.5), int(300 * 3.5))
+# Bump whenever the card layout or assets change, so cached renders are redone
+TEMPLATE_VERSION = 1
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BACKGROUNDS = [
+    ("bg/gold.png", "#eacb5b"),
+    ("bg/fire.png", "#ffc27a"),
+    ("bg/plasma.png", "#262239"),
+    ("bg/gem.png", "#96d497"),
 ]
 
-placeholder = Image.open("./reference/placeholder.png")
-    
-def generate_card_image(card: Card, filename="card.png"):
-    width, height = int(300 * 2.5), int(300* 3.5)
-    bg_color = "yellow"
-    
-    img = Image.new("RGBA", (width, height), bg_color)
-
-    bg_texture, outline_color = random.choice(bgs)
-
-    # pasting im2 on im1
-    Image.Image.paste(img, bg_texture, (0,0))
-
-    draw = ImageDraw.Draw(img)
-    
-    # Fonts (use a basic font if PIL default fonts are unavailable)
-    try:
-        font_italic = ImageFont.truetype("ariali.ttf", 35)
-        font_small = ImageFont.truetype("arial.ttf", 20)
-        font = ImageFont.truetype("arial.ttf", 45)
-        font_dots = ImageFont.truetype("doto.ttf", 30)
-    except:
-        font = ImageFont.load_default()
-        font_italic = ImageFont.load_default()
-        font_dots = ImageFont.load_default()
-    
-    title_font = ImageFont.truetype("arial.ttf", 50) if font else font
-
-    # Card border
-    draw.rectangle([(20, 20), (width - 20, height - 20)], fill=outline_color)
-    draw.rectangle([(45, 90), (width - 45, 520)], outline="black", width=10)
+
+class RenderContext:
+    """
+    Fonts and textures used to draw cards, loaded once and shared by every card
+    in a run. Textures are converted to RGBA and sized to the card up front so
+    drawing a card never has to touch the disk.
+
+    Parameters:
+    - asset_dir: Folder the bg/, reference/ and font files are loaded from
+    - size: Card size in pixels
+    """
+
+    def __init__(self, asset_dir=ASSET_DIR, size=CARD_SIZE):
+        self.asset_dir = asset_dir
+        self.size = size
+
+        self.backgrounds = [
+            (self._load_texture(path, size), outline_color) for path, outline_color in BACKGROUNDS
+        ]
+        self.placeholder = self._load_texture("reference/placeholder.png")
+
+        # Fonts (use a basic font if PIL default fonts are unavailable)
+        self.font_title = self._load_font("arial.ttf", 50)
+        self.font = self._load_font("arial.ttf", 45)
+        self.font_italic = self._load_font("ariali.ttf", 35)
+        self.font_small = self._load_font("arial.ttf", 20)
+        self.font_dots = self._load_font("doto.ttf", 30)
+
+        self._base_layers = {}
+
+    def base_layer(self, background, card_type):
+        """
+        The parts of a card that don't depend on its stats (background, border,
+        art frame, art and rules text) for one background and card type. Built
+        the first time it is asked for, then reused. Callers should copy() it
+        before drawing on it.
+        """
+        key = (background, card_type)
+        if key in self._base_layers:
+            return self._base_layers[key]
+
+        width, height = self.size
+        bg_texture, outline_color = self.backgrounds[background]
+        img = bg_texture.copy()
+
+        draw = ImageDraw.Draw(img)
+
+        # Card border
+        draw.rectangle([(20, 20), (width - 20, height - 20)], fill=outline_color)
+        draw.rectangle([(45, 90), (width - 45, 520)], outline="black", width=10)
+
+        if card_type == CardType.ENTITY_STANDARD:
+            draw.ellipse([(width - 80, 30), (width - 30, 80)],fill="white", outline="black", width=4)
+
+            draw.text((50, 850), f"Rules text can be placed on primary attacks. These rules are actioned when\nthe primary attack is used.", fill="black", font=self.font_small)
+            draw.text((50, 610), f"Cards with ability slots can have more intense associated actions.\nWhilst primary attacks can have some simple rules text, ability slots can be\nused to describe more powerful/wild actions or rules.", fill="black", font=self.font_small)
+            draw.text((width - 300, 530), f"Illus. Autogenerated, Rev 0", fill="black", font=self.font_small)
+            draw.text((50, height - 60), f"Example Aspect", fill="black", font=self.font_small)
+
+        # None of the per card text overlaps the art, so it can go in here too
+        Image.Image.paste(img, self.placeholder, (54,99))
+
+        self._base_layers[key] = img
+        return img
+
+    def _load_texture(self, path, size=None):
+        with Image.open(os.path.join(self.asset_dir, path)) as texture:
+            texture = texture.convert("RGBA")
+
+        if size and texture.size != size:
+            texture = texture.resize(size)
+
+        return texture
+
+    def _load_font(self, name, size):
+        for path in (os.path.join(self.asset_dir, name), name):
+            try:
+                return ImageFont.truetype(path, size)
+            except OSError:
+                pass
+
+        return ImageFont.load_default()
+
+
+def dedupe_cards(cards):
+    """
+    Drop repeated cards, keeping the first copy of each in order.
+
+    CardBatches are deduplicated on their key column in one go, anything else
+    goes through a dict keyed on the precomputed card_key.
+    """
+    if isinstance(cards, CardBatch):
+        return [CardView(cards, index) for index in cards.unique_indices().tolist()]
+
+    unique = {}
+    for card in cards:
+        unique.setdefault(card.card_key, card)
+    return list(unique.values())
+
+
+def card_background(card: Card):
+    """
+    Background index for a card. Taken from its ID so a card looks the same every time it is rendered.
+    """
+    return int(card.unique_card_id, 36) % len(BACKGROUNDS)
+
+
+_default_render_context = None
+
+
+def get_render_context():
+    """
+    Returns the shared RenderContext, loading it the first time it is needed.
+    """
+    global _default_render_context
+    if _default_render_context is None:
+        _default_render_context = RenderContext()
+
+    return _default_render_context
+
+
+def render_card_image(card: Card, context: RenderContext = None, background=None):
+    """
+    Draw a card and return the image.
+
+    Parameters:
+    - card: The card to draw
+    - context: RenderContext holding the fonts and textures, the shared one by default
+    - background: Index into the context backgrounds, card_background(card) if None
+
+    Returns:
+    - An RGBA PIL Image
+    """
+    context = context or get_render_context()
+    width, height = context.size
+
+    if background is None:
+        background = card_background(card)
+
+    img = context.base_layer(background, card.card_type).copy()
 
     if card.card_type == CardType.ENTITY_STANDARD:
-        
-        draw.ellipse([(width - 80, 30), (width - 30, 80)],fill="white", outline="black", width=4)
-        
+        draw = ImageDraw.Draw(img)
+
         # Title
-        draw.text((40, 30), f"Card ID: {card.unique_card_id}", fill="black", font=title_font)
+        draw.text((40, 30), f"Card ID: {card.unique_card_id}", fill="black", font=context.font_title)
         
         # Health
-        draw.text((width - 90, 40), f"{card.health}", fill="red", font=font, anchor="rt")
+        draw.text((width - 90, 40), f"{card.health}", fill="red", font=context.font, anchor="rt")
         
         # Attack
-        draw.text((50, 800), f"Primary Attack:                    {card.primary_attack}", fill="blue", font=font)
-        draw.text((50, 850), f"Rules text can be placed on primary attacks. These rules are actioned when\nthe primary attack is used.", fill="black", font=font_small)
+        draw.text((50, 800), f"Primary Attack:                    {card.primary_attack}", fill="blue", font=context.font)
         if card.secondary_attack:
-            draw.text((50, 700), f"Secondary Attack:               {card.secondary_attack}", fill="blue", font=font)
+            draw.text((50, 700), f"Secondary Attack:               {card.secondary_attack}", fill="blue", font=context.font)
         
-            # Ability
+        # Ability
         ability_text = "Yes" if card.has_ability else "No"
-        draw.text((50, 610), f"Cards with ability slots can have more intense associated actions.\nWhilst primary attacks can have some simple rules text, ability slots can be\nused to describe more powerful/wild actions or rules.", fill="black", font=font_small)
-        draw.text((50, 560), f"Ability: {ability_text}", fill="green", font=font)
+        draw.text((50, 560), f"Ability: {ability_text}", fill="green", font=context.font)
         # Power Rating
         #draw.text((40, 700), f"Power: {card.power_rating:.1f}", fill="black", font=font)
         
         # Rarity
-        draw.text((50, 520), f"{card.rarity} Card", fill=(32, 176, 154), font=font_italic)
-        draw.text((width - 300, 530), f"Illus. Autogenerated, Rev 0", fill="black", font=font_small)
-        
+        draw.text((50, 520), f"{card.rarity} Card", fill=(32, 176, 154), font=context.font_italic)
 
-        draw.text((610, height - 60), f"{card.unique_card_id}", fill="black", font=font_dots)
-        draw.text((50, height - 60), f"Example Aspect", fill="black", font=font_small)
+        draw.text((610, height - 60), f"{card.unique_card_id}", fill="black", font=context.font_dots)
 
-    Image.Image.paste(img, placeholder, (54,99))
+    return img
+
+
+def generate_card_image(card: Card, filename="card.png", context: RenderContext = None):
+    img = render_card_image(card, context)
     # Save image
     img.save(filename)
     print(f"Card image saved as {filename}")
 
 
+_worker_render_context = None
+
+
+def _init_render_worker(asset_dir):
+    # Every worker process loads its own copy of the assets once
+    global _worker_render_context
+    _worker_render_context = RenderContext(asset_dir)
+
+
+def _render_job(card, background, encode):
+    img = render_card_image(card, _worker_render_context, background)
+    if encode is None:
+        return img
+
+    buffer = io.BytesIO()
+    img.save(buffer, format=encode)
+    return buffer.getvalue()
+
+
+def iter_rendered_cards(cards, workers=None, encode="PNG", asset_dir=ASSET_DIR):
+    """
+    Render cards across a process pool, yielding them in the same order as `cards`.
+
+    Only a few cards per worker are in flight at a time, so `cards` can be a
+    generator of any length.
+
+    Parameters:
+    - cards: Iterable of Card objects
+    - workers: Number of worker processes, defaults to the CPU count
+    - encode: PIL format name the workers encode to, or None to get the Image back
+    - asset_dir: Folder the render assets are loaded from
+
+    Returns:
+    - Generator of (index, card, data) with data the encoded bytes or an Image
+    """
+    workers = workers or os.cpu_count()
+    pending = deque()
+
+    with ProcessPoolExecutor(workers, initializer=_init_render_worker, initargs=(asset_dir,)) as pool:
+        for index, card in enumerate(cards):
+            pending.append((index, card, pool.submit(_render_job, card, card_background(card), encode)))
+
+            if len(pending) >= workers * 4:
+                index, card, future = pending.popleft()
+                yield index, card, future.result()
+
+        while pending:
+            index, card, future = pending.popleft()
+            yield index, card, future.result()
+
+
+def render_cards(cards, output_dir, workers=None, name_format="{index:05d}_{id}.png", asset_dir=ASSET_DIR, report_every=5.0,
+                 cache: RenderCache = None, metrics: RunMetrics = None):
+    """
+    Render many cards across a process pool and write them to disk.
+
+    Workers draw and PNG encode the cards, this process writes the files (see
+    iter_rendered_cards). With a RenderCache, cards whose rendered fields and
+    template haven't changed are hard linked from the cache instead of being
+    drawn again, or left alone if the output file already is the cached one.
+
+    Parameters:
+    - cards: Iterable of Card objects
+    - output_dir: Folder to write the images to (created if needed)
+    - workers: Number of worker processes, defaults to the CPU count
+    - name_format: File name format, given the card's `index` and `id`
+    - asset_dir: Folder the render assets are loaded from
+    - report_every: Seconds between progress lines (when no metrics are passed in)
+    - cache: Optional RenderCache to reuse earlier renders from
+    - metrics: Optional RunMetrics to record progress, counts and write time in
+
+    Returns:
+    - Number of cards written (rendered or linked from the cache)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    if metrics is None:
+        metrics = RunMetrics("render_cards", report_every=report_every, check_every=1)
+
+    rendered = 0
+    linked = 0
+    unchanged = 0
+    write_seconds = 0.0
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+
+    # (filename, cache key) for every card sent off to be rendered, in order
+    to_write = deque()
+
+    def cards_to_render():
+        nonlocal linked, unchanged
+        for index, card in enumerate(cards):
+            filename = os.path.join(output_dir, name_format.format(index=index, id=card.unique_card_id))
+            key = None
+
+            if cache is not None:
+                key = render_key(card, card_background(card), TEMPLATE_VERSION)
+                if cache.get(key):
+                    if cache.export(key, filename):
+                        linked += 1
+                    else:
+                        unchanged += 1
+                    metrics.tick()
+                    continue
+
+            to_write.append((filename, key))
+            yield card
+
+    for _, card, data in iter_rendered_cards(cards_to_render(), workers, "PNG", asset_dir):
+        filename, key = to_write.popleft()
+        start = time.perf_counter()
+        if key is None:
+            with open(filename, "wb") as file:
+                file.write(data)
+        else:
+            cache.put(key, data)
+            cache.export(key, filename)
+        write_seconds += time.perf_counter() - start
+        rendered += 1
+        metrics.tick()
+
+    metrics.add_counts({"rendered": rendered, "linked": linked, "unchanged": unchanged})
+    metrics.add_time("write", write_seconds)
+    if cache is not None:
+        metrics.add_counts({"cache_hits": cache.hits - hits, "cache_misses": cache.misses - misses})
+
+    elapsed = metrics.summary()["elapsed"]
+    print(f"Rendered {rendered} cards to {output_dir} in {elapsed:.2f}s [{rendered / max(elapsed, 1e-9):.1f} cards/s]")
+    if cache is not None:
+        print(f"Render cache: {linked} linked, {unchanged} unchanged, {len(cache)} entries, {cache.size / 1024 ** 2:.1f} MB")
+
+    return rendered + linked
+
 
 def short_hash(data):
     """
@@ -219,150 +707,207 @@ def short_hash(data):
 
 
 
-def generate_stats(distribution="normal", mean=50, std_dev=15, num_samples=1000):
+def generate_stats(distribution="normal", mean=50, std_dev=15, num_samples=1000, rng=None, low=None, high=None, k=10,
+                   histogram=None, step=None):
     """
-    Generate random stats based on either a normal or logistic distribution.
+    Generate random stats from one of the stat distributions.
+
+    All of them draw num_samples values in one pass. Bounded ones sample through
+    an inverse CDF instead of throwing away out of range values (see samplers.py).
 
     Parameters:
-    - distribution: "normal" or "logistic"
+    - distribution: "normal", "logistic", "sigmoid" or "empirical"
     - mean: The mean (center) of the distribution
     - std_dev: The standard deviation (spread)
-    - num_samples: Number of values to generate
+    - num_samples: Number of values to generate (or an array shape)
+    - rng: numpy Generator or seed to draw from, fresh entropy if None
+    - low: Lower bound. Truncates "normal", "logistic" and "empirical", the bottom of the range for "sigmoid" (0 if None)
+    - high: Upper bound. Truncates "normal", "logistic" and "empirical", the top of the range for "sigmoid" (100 if None)
+    - k: Steepness of the "sigmoid" curve (higher = more extreme values)
+    - histogram: (values, weights) or (edges, counts) target for "empirical"
+    - step: Round the stats to multiples of step. low and high then bound the rounded values, so
+      generate_stats(low=20, step=10) gives exactly num_samples stats that round to 20 or more
 
     Returns:
-    - List of generated values
+    - Array of generated values
     """
+    rng = make_rng(rng)
+    bounded = low is not None or high is not None
+
+    # Truncate half a step outside the bounds, so rounding lands everything from there on a bound or inside
+    sample_low, sample_high = low, high
+    if step:
+        sample_low = None if low is None else low - step / 2
+        sample_high = None if high is None else high + step / 2
+
     if distribution == "normal":
-        stats = np.random.normal(loc=mean, scale=std_dev, size=num_samples)
+        if bounded:
+            stats = truncated_normal_stats(num_samples, mean, std_dev, sample_low, sample_high, rng)
+        else:
+            stats = rng.normal(loc=mean, scale=std_dev, size=num_samples)
     elif distribution == "logistic":
         scale = std_dev / 1.813  # Approximate mapping of std_dev to logistic scale
-        stats = np.random.logistic(loc=mean, scale=scale, size=num_samples)
+        if bounded:
+            stats = truncated_logistic_stats(num_samples, mean, scale, sample_low, sample_high, rng)
+        else:
+            stats = rng.logistic(loc=mean, scale=scale, size=num_samples)
+    elif distribution == "sigmoid":
+        stats = sigmoid_stats(num_samples, 0 if low is None else low, 100 if high is None else high, k, rng)
+    elif distribution == "empirical":
+        if histogram is None:
+            raise ValueError("The empirical distribution needs a histogram.")
+        stats = empirical_stats(num_samples, histogram, rng, sample_low, sample_high)
     else:
-        raise ValueError("Invalid distribution type. Choose 'normal' or 'logistic'.")
-
-    return stats
-
-def plot_distribution(stats, title="Stat Distribution"):
-    """
-    Plot a histogram of the generated stats.
-
-    Parameters:
-    - stats: List of values
-    - title: Title of the histogram
-    """
-    vals, bins, bars = plt.hist(stats, bins=100, alpha=0.75, color="blue", edgecolor="black", density=True)
-    plt.title(title)
-    plt.xlabel("Value")
-    plt.ylabel("Density")
-    plt.grid()
-    plt.show()
+        raise ValueError("Invalid distribution type. Choose 'normal', 'logistic', 'sigmoid' or 'empirical'.")
 
-# Example Usage:
-if __name__ == "__main__":
-
-    count = {
-        "Legendary": 0,
-        "Common": 0,
-        "Ultra Rare": 0,
-        "Uncommon": 0,
-        "Rare": 0
-    }
-
-    PACK_COUNT = 10
-    best_card_found = None
-    best_power = 0
-
-    cards_made = 0
-    abilities_made = 0
-    ability_bins = {}
-    ability_stats = []
-    for i in range(PACK_COUNT):
-        #stats = logistic_curve_stats(min_val=0, max_val=100, num_samples=200, k=8)
-        # plot_distribution(stats, title="Logistic (Sigmoid) Curve Distribution")
-        
-        #Maybe use 30 for booster creation reasons?
-        stats = generate_stats(distribution="normal", mean=50, std_dev=32, num_samples=28)
-        stats = np.round(stats/10) * 10
+    if step:
+        stats = np.round(stats / step) * step
+        if bounded:
+            # np.round rounds halves to even, which can put an exact half step on the wrong side of a bound
+            stats = np.clip(stats, -np.inf if low is None else low, np.inf if high is None else high)
 
-        valid_cards: List[Card] = []
-
-        for stat in stats:
+    return stats
 
-            if stat < 20: continue
-            cards_made += 1
-            att = round(random.uniform(stat*0.3, stat)*0.8/10)*10
+PACK_SIZE = 15
+MIDDLE_CARDS = PACK_SIZE - 2
+STATS_PER_PACK = 28
+MIN_HEALTH = 20
+STAT_STEP = 10  # Health is rounded to tens
 
-            card = Card(health=stat, primary_attack=att)
 
-            if card.has_ability:
-                abilities_made += 1
-                ability_stats.append(stat)
-                if stat in ability_bins:
-                    ability_bins[stat] += 1
-                else:
-                    ability_bins[stat] = 1
+def _valid_count_weights(mean, std_dev, stats_per_pack):
+    # Chance of each number of valid stats (PACK_SIZE..stats_per_pack) in a roll of stats_per_pack, given
+    # there were at least PACK_SIZE. A stat is valid when it rounds to MIN_HEALTH or more
+    p = 0.5 * math.erfc((MIN_HEALTH - STAT_STEP / 2 - mean) / (std_dev * math.sqrt(2)))
+    counts = np.arange(PACK_SIZE, stats_per_pack + 1)
+    weights = np.array([math.comb(stats_per_pack, count) * p ** count * (1 - p) ** (stats_per_pack - count)
+                        for count in counts])
+    if not weights.sum() > 0:
+        raise ValueError(f"A roll of {stats_per_pack} stats can't fill a {PACK_SIZE} card pack with this distribution.")
+    return counts, weights
 
-            #print(f"Health: {stat}, Attack: {att}")
-            valid_cards.append(card)
 
-        #plot_distribution(stats, title=f"{distribution_type.capitalize()} Distribution")
+def build_packs(packs, rng=None, mean=50, std_dev=32, stats_per_pack=STATS_PER_PACK, metrics: RunMetrics = None):
+    """
+    Roll the stats for many booster packs at once.
 
-        valid_cards.sort(key=lambda x: x.power_rating)
+    Every pack rolls stats_per_pack health values, drops anything under
+    MIN_HEALTH, and keeps its weakest card, its strongest card and MIDDLE_CARDS
+    random cards from the rest. Rather than rolling and filtering, each pack
+    draws how many of its stats were valid (from the binomial odds, given at
+    least PACK_SIZE) and then exactly that many stats from the normal truncated
+    at MIN_HEALTH, which is the same thing without ever rolling a pack again.
 
-        # power_ratings = []
-        # for stat in valid_stats:
-        #     power_ratings.append(stat[0])
+    The rest is done on (packs x stats_per_pack) arrays: unused stats are
+    masked to +inf power, one argsort per row orders the pack, and argpartition
+    over random keys picks the middle cards.
 
-        
-        # percentiles = np.percentile(power_ratings, np.arange(0, 101, 5))
+    Parameters:
+    - packs: Number of packs
+    - rng: numpy Generator or seed to draw from
+    - mean: Mean of the health distribution
+    - std_dev: Standard deviation of the health distribution
+    - stats_per_pack: Stats rolled per pack before filtering
+    - metrics: Optional RunMetrics, ticked with the pack count and given the build time
 
-        # # Print percentile ranges
-        # for i in range(len(percentiles) - 1):
-        #     print(f"{i * 5}-{(i + 1) * 5}%: {percentiles[i]:.2f} to {percentiles[i + 1]:.2f}")
+    Returns:
+    - (health, attack) arrays of shape (packs x PACK_SIZE), ordered worst card,
+      middle cards (weakest first), best card
+    """
+    start = time.perf_counter()
+    rng = make_rng(rng)
 
-        # plot_distribution(power_ratings, title=f"Power Distribution")
+    valid_counts = generate_stats("empirical", num_samples=packs, rng=rng,
+                                  histogram=_valid_count_weights(mean, std_dev, stats_per_pack)).astype(np.int64)
+    stats = generate_stats("normal", mean, std_dev, (packs, stats_per_pack), rng, low=MIN_HEALTH, step=STAT_STEP)
 
+    positions = np.arange(stats_per_pack)
+    valid = positions < valid_counts[:, None]
+    attack = np.round(rng.uniform(stats * 0.3, stats) * 0.8 / 10) * 10
+    power = np.where(valid, stats + 1.2 * attack, np.inf)
 
+    # Valid stats first, weakest to strongest
+    order = np.argsort(power, axis=1, kind="stable")
+    rows = np.arange(packs)[:, None]
 
-        print(valid_cards[0])
+    # Random keys, with the worst, the best and the unused stats (positions outside 1..valid-2) pushed to the back
+    keys = rng.random((packs, stats_per_pack))
+    keys[(positions < 1) | (positions >= valid_counts[:, None] - 1)] = np.inf
+    middle = np.sort(np.argpartition(keys, MIDDLE_CARDS - 1, axis=1)[:, :MIDDLE_CARDS], axis=1)
 
-        count[valid_cards[0].rarity] += 1
+    slots = np.concatenate([order[:, :1], order[rows, middle], order[rows, valid_counts[:, None] - 1]], axis=1)
+    health, attack = stats[rows, slots], attack[rows, slots]
 
+    if metrics is not None:
+        metrics.add_time("build_packs", time.perf_counter() - start)
+        metrics.tick(packs)
 
-        best_card = valid_cards[-1]
+    return health, attack
 
-        if best_card.power_rating > best_power:
-            best_power = best_card.power_rating
-            best_card_found = best_card
 
+def plot_distribution(stats, title="Stat Distribution", filename=None):
+    """
+    Plot a histogram of the generated stats.
 
-        count[best_card.rarity] += 1
+    For more stats than fit in memory, or on a machine without a display, use
+    analytics.CardAnalytics / DistributionTracker instead.
 
-        pack_choices = valid_cards[1:-1]
+    Parameters:
+    - stats: List of values
+    - title: Title of the histogram
+    - filename: Save the plot to this PNG instead of opening a window
+    """
+    vals, bins, bars = plt.hist(stats, bins=100, alpha=0.75, color="blue", edgecolor="black", density=True)
+    plt.title(title)
+    plt.xlabel("Value")
+    plt.ylabel("Density")
+    plt.grid()
 
-        choices = random.sample(pack_choices, k=13)
-        for choice in choices:
-            print(choice)
-            count[choice.rarity] += 1
+    if filename:
+        plt.savefig(filename)
+        plt.close()
+    else:
+        plt.show()
 
-        print(best_card)
+# Example Usage:
+if __name__ == "__main__":
 
+    PACK_COUNT = 10
+    PACK_SEED = None  # Set to an int to open the same packs every run
+    rng = make_rng(PACK_SEED)
+
+    #stats = logistic_curve_stats(min_val=0, max_val=100, num_samples=200, k=8)
+    # plot_distribution(stats, title="Logistic (Sigmoid) Curve Distribution")
+
+    #Maybe use 30 for booster creation reasons?
+    health, attack = build_packs(PACK_COUNT, rng, mean=50, std_dev=32)
+    packs = CardBatch(health.ravel(), attack.ravel(), rng)
+
+    count = {label: 0 for label in packs.rarity_table.labels}
+    for pack in range(PACK_COUNT):
+        # Worst card, 13 middle cards, best card
+        for index in range(pack * PACK_SIZE, (pack + 1) * PACK_SIZE):
+            card = packs[index]
+            print(card)
+            count[card.rarity] += 1
+
+    abilities_made = int(np.count_nonzero(packs.has_ability))
+    cards_made = len(packs)
     print(f"{abilities_made} Abilities / {cards_made} Cards [{abilities_made/cards_made * 100 :.2f}]")
 
-    #plt.bar(np.array(list(ability_bins.keys())), np.array(list(ability_bins.values())))
-    # plt.hist(ability_stats, bins=15)
+    #plt.hist(health.ravel()[packs.has_ability], bins=15)
     # plt.show()
 
     print(" ")
     print(count)
     print("============================")
-    print(f"Total: {PACK_COUNT * 15}")
-    print(f"Common: {count['Common']} [{(count['Common']/(PACK_COUNT * 15)) * 100:.2f}%] 1-in-{round(1/(count['Common']/(PACK_COUNT * 15.0)))}")
-    print(f"Uncommon: {count['Uncommon']} [{(count['Uncommon']/(PACK_COUNT * 15)) * 100:.2f}%] 1-in-{round(1/(count['Uncommon']/(PACK_COUNT * 15.0)))}")
-    print(f"Rare: {count['Rare']} [{(count['Rare']/(PACK_COUNT * 15)) * 100:.2f}%] 1-in-{round(1/(count['Rare']/(PACK_COUNT * 15)))}")
-    print(f"Ultra Rare: {count['Ultra Rare']} [{(count['Ultra Rare']/(PACK_COUNT * 15)) * 100:.2f}%] 1-in-{round(1/(count['Ultra Rare']/(PACK_COUNT * 15.0)))}")
-    print(f"Legendary: {count['Legendary']} [{(count['Legendary']/(PACK_COUNT * 15)) * 100:.2f}%] 1-in-{round(1/(count['Legendary']/(PACK_COUNT * 15.0)))}")
+    print(f"Total: {cards_made}")
+    for rarity, found in count.items():
+        odds = f"1-in-{round(cards_made / found)}" if found else "never"
+        print(f"{rarity}: {found} [{(found / cards_made) * 100:.2f}%] {odds}")
     print("")
+
+    best_card_found = packs.card(int(np.argmax(packs.power_rating)))
     print(f"Best card: {best_card_found}")
 
         # Example card object
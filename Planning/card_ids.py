@@ -0,0 +1,251 @@
+import hashlib
+import struct
+
+import numpy as np
+
+ID_LENGTH = 6
+ID_SPACE = 36 ** ID_LENGTH
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+_alphabet_bytes = np.frombuffer(ALPHABET.encode('ascii'), dtype=np.uint8)
+_alphabet_lookup = np.full(256, 255, dtype=np.uint8)
+_alphabet_lookup[_alphabet_bytes] = np.arange(36, dtype=np.uint8)
+_alphabet_lookup[np.frombuffer(ALPHABET.lower().encode('ascii'), dtype=np.uint8)] = np.arange(36, dtype=np.uint8)
+
+# Fixed binary layout hashed for each card, 6 bytes per card
+CARD_FIELDS_DTYPE = np.dtype([
+    ("health", "<i2"),
+    ("attack", "<i2"),
+    ("seed", "u1"),
+    ("card_type", "u1"),
+])
+_card_fields_struct = struct.Struct("<hhBB")
+
+
+def short_hash_case_insensitive(data):
+    """
+    Generate a 6-character case-insensitive alphanumeric hash.
+
+    This is the original (legacy) card ID scheme, kept so existing IDs still verify.
+
+    Parameters:
+    - data: Any input (string, number, object that can be converted to a string)
+
+    Returns:
+    - A 6-character uppercase alphanumeric hash (Base36)
+    """
+    # Ensure data is a string and encode to bytes
+    data_bytes = str(data).encode('utf-8')
+
+    # Create a SHA-256 hash
+    sha256_hash = hashlib.sha256(data_bytes).digest()
+
+    # Convert hash to an integer
+    hash_int = int.from_bytes(sha256_hash, 'big')
+
+    # Convert to Base36 (case-insensitive alphanumeric)
+    base36_hash = ''
+
+    # Extract 6 characters from Base36
+    while hash_int and len(base36_hash) < 6:
+        base36_hash = ALPHABET[hash_int % 36] + base36_hash
+        hash_int //= 36
+
+    # Pad with leading zeros if necessary
+    return base36_hash.rjust(6, '0')
+
+
+def encode_base36(values):
+    """
+    Convert an array of integers below ID_SPACE into an array of 6-character Base36 strings.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    digits = np.empty((len(values), ID_LENGTH), dtype=np.uint8)
+    for position in range(ID_LENGTH - 1, -1, -1):
+        digits[:, position] = values % np.uint64(36)
+        values = values // np.uint64(36)
+
+    return _alphabet_bytes[digits].view(f"S{ID_LENGTH}").ravel().astype(f"<U{ID_LENGTH}")
+
+
+def decode_base36(ids):
+    """
+    Convert an array of 6-character Base36 IDs (any case) back into uint32 values.
+    """
+    raw = np.asarray(ids, dtype=f"S{ID_LENGTH}")
+    digits = _alphabet_lookup[raw.view(np.uint8).reshape(-1, ID_LENGTH)]
+    if np.any(digits == 255):
+        raise ValueError("IDs may only contain 0-9 and A-Z.")
+
+    values = np.zeros(len(digits), dtype=np.uint64)
+    for position in range(ID_LENGTH):
+        values = values * np.uint64(36) + digits[:, position]
+
+    return values.astype(np.uint32)
+
+
+def pack_card_fields(health, attack, seed, card_type):
+    """
+    Pack card fields into the fixed binary layout used for hashing.
+
+    Parameters:
+    - health, attack: Arrays of values that fit in an int16
+    - seed: Array of card specific seeds
+    - card_type: Array of card type codes
+
+    Returns:
+    - A structured array with dtype CARD_FIELDS_DTYPE
+    """
+    fields = np.empty(len(health), dtype=CARD_FIELDS_DTYPE)
+    fields["health"] = health
+    fields["attack"] = attack
+    fields["seed"] = seed
+    fields["card_type"] = card_type
+    return fields
+
+
+def card_keys(health, attack, seed, card_type):
+    """
+    One uint64 key per card: the packed 6 byte fields zero padded to 8 bytes.
+    Cards with the same fields always get the same key.
+    """
+    packed = pack_card_fields(np.asarray(health), np.asarray(attack), np.asarray(seed), np.asarray(card_type))
+
+    keys = np.zeros(len(packed), dtype="<u8")
+    keys.view(np.uint8).reshape(-1, 8)[:, :packed.itemsize] = packed.view(np.uint8).reshape(-1, packed.itemsize)
+    return keys
+
+
+def card_key(health, attack, seed, card_type):
+    """
+    Scalar version of card_keys, gives the same integer for the same fields.
+    """
+    return (
+        (int(health) & 0xFFFF)
+        | (int(attack) & 0xFFFF) << 16
+        | (int(seed) & 0xFF) << 32
+        | (int(card_type) & 0xFF) << 40
+    )
+
+
+def fields_from_keys(keys):
+    """
+    Inverse of card_keys, returns a structured array with dtype CARD_FIELDS_DTYPE.
+    """
+    keys = np.ascontiguousarray(keys, dtype="<u8")
+    size = CARD_FIELDS_DTYPE.itemsize
+    return np.ascontiguousarray(keys.view(np.uint8).reshape(-1, 8)[:, :size]).view(CARD_FIELDS_DTYPE).ravel()
+
+
+def _salt_bytes(salt):
+    # blake2b's default salt is empty, so salt 0 hashes the same as no salt at all
+    return int(salt).to_bytes(8, 'little') if salt else b''
+
+
+def _digest_values(packed, salt=0):
+    # blake2b with an 8 byte digest gives one uint64 per card
+    row_bytes = packed.tobytes()
+    size = packed.itemsize
+    salt = _salt_bytes(salt)
+    digests = b"".join(
+        hashlib.blake2b(row_bytes[start:start + size], digest_size=8, salt=salt).digest()
+        for start in range(0, len(row_bytes), size)
+    )
+    return np.frombuffer(digests, dtype="<u8") % np.uint64(ID_SPACE)
+
+
+def id_values_for_keys(keys, salt=0):
+    """
+    Numeric (uint32) IDs for an array of card keys, hashed with the given salt.
+    """
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    values = _digest_values(fields_from_keys(unique_keys), salt).astype(np.uint32)
+    return values[inverse.ravel()]
+
+
+def card_id(health, attack, seed, card_type, salt=0):
+    """
+    Card ID for a single card. card_type is the integer type code.
+
+    Gives the same ID card_ids would for the same fields, without going through NumPy.
+    A non zero salt gives the alternative ID used when the plain one collides.
+    """
+    packed = _card_fields_struct.pack(int(health), int(attack), int(seed), int(card_type))
+    digest = hashlib.blake2b(packed, digest_size=8, salt=_salt_bytes(salt)).digest()
+    value = int.from_bytes(digest, 'little') % ID_SPACE
+
+    base36_id = ''
+    for _ in range(ID_LENGTH):
+        value, digit = divmod(value, 36)
+        base36_id = ALPHABET[digit] + base36_id
+
+    return base36_id
+
+
+def card_ids(health, attack, seed, card_type, legacy=False, card_types=None):
+    """
+    Card IDs for whole arrays of cards.
+
+    Only distinct cards are hashed, so large batches with repeated stats are cheap.
+
+    Parameters:
+    - health, attack, seed, card_type: Arrays of card fields (card_type as integer codes)
+    - legacy: Produce the original SHA-256 over str([...]) IDs instead
+    - card_types: Objects for each type code, needed for legacy IDs since their
+      text is part of what was hashed
+
+    Returns:
+    - Array of 6-character ID strings
+    """
+    # Integer keys unique far faster than the structured records do
+    unique_keys, inverse = np.unique(card_keys(health, attack, seed, card_type), return_inverse=True)
+    unique_rows = fields_from_keys(unique_keys)
+
+    if legacy:
+        if card_types is None:
+            raise ValueError("card_types is needed to build legacy IDs.")
+
+        ids = np.array([
+            short_hash_case_insensitive([int(row["health"]), int(row["attack"]), int(row["seed"]), card_types[row["card_type"]]])
+            for row in unique_rows
+        ], dtype=f"<U{ID_LENGTH}")
+    else:
+        ids = encode_base36(_digest_values(unique_rows))
+
+    return ids[inverse.ravel()]
+
+
+def verify_card_id(unique_card_id, health, attack, seed, card_type, card_types=None, salt=0):
+    """
+    Check an ID against card fields. Accepts both current IDs and, when
+    card_types is given, legacy IDs. Pass the salt an IdRegistry issued to
+    check a salted ID.
+    """
+    # Plain ints, numpy scalars would change the str() the legacy hash is taken over
+    health, attack, seed, card_type = int(health), int(attack), int(seed), int(card_type)
+
+    unique_card_id = unique_card_id.upper()
+    if card_id(health, attack, seed, card_type, salt) == unique_card_id:
+        return True
+
+    if card_types is not None:
+        return short_hash_case_insensitive([health, attack, seed, card_types[card_type]]) == unique_card_id
+
+    return False
+
+
+if __name__ == "__main__":
+    # Self check: IDs verify from plain ints, numpy arrays and CardBatch columns alike
+    from card_gen import CARD_TYPES, CardBatch
+
+    batch = CardBatch([20, 50, 50, 120, 200], [10, 30, 30, 90, 160], rng=0)
+    columns = (batch.health, batch.primary_attack, batch.card_seed, batch.card_type_code)
+    legacy_ids = card_ids(*columns, legacy=True, card_types=CARD_TYPES)
+
+    for index in range(len(batch)):
+        fields = [column[index] for column in columns]
+        assert verify_card_id(batch.unique_card_id[index], *fields), fields
+        assert verify_card_id(legacy_ids[index], *fields, card_types=CARD_TYPES), fields
+        assert verify_card_id(legacy_ids[index], *(int(field) for field in fields), card_types=CARD_TYPES), fields
+
+    print(f"verify_card_id OK for {len(batch)} cards")
@@ -0,0 +1,230 @@
+import os
+
+import numpy as np
+
+from card_ids import card_keys, decode_base36, encode_base36, id_values_for_keys
+
+REGISTRY_MAGIC = b"DIDR"
+REGISTRY_VERSION = 1
+MAX_SALT = 64
+
+# Lookup results
+NEW = 0
+REGISTERED = 1
+COLLISION = 2
+
+_HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u4"),
+    ("capacity", "<u8"),
+    ("count", "<u8"),
+    ("reserved", "V8"),
+])
+
+# id is stored as the numeric ID + 1 so an all zero slot means empty
+_SLOT_DTYPE = np.dtype([
+    ("id", "<u4"),
+    ("key", "<u8"),
+])
+
+
+class IdRegistry:
+    """
+    Persistent record of every card ID that has been issued.
+
+    Stored as a memory mapped open addressing hash table of (numeric ID, card key)
+    slots. Card IDs are already hashes, so the ID itself picks the slot and a
+    lookup or insert touches one or two slots on average. Everything works on
+    NumPy arrays, so millions of new IDs can be checked or registered at once.
+
+    When a new card's ID is already taken by a different card, it is re-hashed
+    with salt 1, 2, ... until a free ID turns up. The salt only depends on what
+    is already in the registry, so registering the same card again always gives
+    back the same ID.
+
+    The salted ID only exists in the registry and in what register() /
+    register_keys() return. Cards have to be given that ID, either by building
+    them with Card(..., id_registry=) / CardBatch(..., id_registry=) or by
+    storing the returned IDs yourself. card_id() / card_ids() alone always give
+    the unsalted ID (card_id takes the salt to rebuild a salted one).
+
+    Parameters:
+    - path: File to keep the registry in, created if it doesn't exist
+    - capacity: Initial slot count for a new registry (rounded up to a power of two)
+    - max_load: Fraction of slots that may be used before the table is grown
+    """
+
+    def __init__(self, path, capacity=1 << 20, max_load=0.5):
+        self.path = path
+        self.max_load = max_load
+
+        if not os.path.exists(path):
+            self._create(path, 1 << max(int(capacity) - 1, 1).bit_length())
+
+        self._open()
+
+    @staticmethod
+    def _create(path, capacity):
+        header = np.zeros(1, dtype=_HEADER_DTYPE)
+        header["magic"] = REGISTRY_MAGIC
+        header["version"] = REGISTRY_VERSION
+        header["capacity"] = capacity
+
+        with open(path, "wb") as file:
+            file.write(header.tobytes())
+            file.truncate(_HEADER_DTYPE.itemsize + capacity * _SLOT_DTYPE.itemsize)
+
+    def _open(self, path=None):
+        # Maps self.path unless another file is given, _grow fills its new table through this too
+        path = path or self.path
+        self._header = np.memmap(path, dtype=_HEADER_DTYPE, mode="r+", shape=(1,))
+        if self._header["magic"][0] != REGISTRY_MAGIC or self._header["version"][0] != REGISTRY_VERSION:
+            raise ValueError(f"{path} is not a card ID registry.")
+
+        self.capacity = int(self._header["capacity"][0])
+        self._slots = np.memmap(
+            path, dtype=_SLOT_DTYPE, mode="r+", offset=_HEADER_DTYPE.itemsize, shape=(self.capacity,)
+        )
+
+    def __len__(self):
+        return int(self._header["count"][0])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def flush(self):
+        self._header.flush()
+        self._slots.flush()
+
+    def close(self):
+        self.flush()
+        del self._header, self._slots
+
+    def _walk(self, values, keys, insert):
+        """
+        Probe the table for every (value, key) pair at once.
+
+        Returns an array of NEW / REGISTERED / COLLISION per pair. With insert set,
+        NEW pairs are written to the table. When several pairs land on the same
+        empty slot in a round only the first is written, the rest look again next
+        round (and collide if they share its ID).
+        """
+        mask = self.capacity - 1
+        stored_ids = values.astype(np.uint32) + np.uint32(1)
+        status = np.empty(len(values), dtype=np.uint8)
+        position = values.astype(np.int64) & mask
+        pending = np.arange(len(values))
+
+        while len(pending):
+            slots = position[pending]
+            entries = self._slots[slots]
+
+            empty = entries["id"] == 0
+            same_id = entries["id"] == stored_ids[pending]
+            same_card = same_id & (entries["key"] == keys[pending])
+
+            status[pending[same_card]] = REGISTERED
+            status[pending[same_id & ~same_card]] = COLLISION
+
+            if insert and np.any(empty):
+                candidates = pending[empty]
+                _, first = np.unique(slots[empty], return_index=True)
+                winners = candidates[first]
+
+                self._slots[position[winners]] = np.rec.fromarrays(
+                    [stored_ids[winners], keys[winners]], dtype=_SLOT_DTYPE
+                )
+                self._header["count"] += len(winners)
+                status[winners] = NEW
+
+                still_empty = np.ones(len(candidates), dtype=bool)
+                still_empty[first] = False
+                retry = candidates[still_empty]
+            else:
+                status[pending[empty]] = NEW
+                retry = pending[:0]
+
+            moving = pending[~empty & ~same_id]
+            position[moving] = (position[moving] + 1) & mask
+            pending = np.concatenate([moving, retry])
+
+        return status
+
+    def _grow(self, incoming):
+        capacity = self.capacity
+        while len(self) + incoming > capacity * self.max_load:
+            capacity *= 2
+
+        if capacity == self.capacity:
+            return
+
+        entries = np.array(self._slots[self._slots["id"] != 0])
+        self.close()
+
+        # Fill and flush the bigger table on the side, the old file stays the registry until it is swapped in
+        temp_path = self.path + ".tmp"
+        self._create(temp_path, capacity)
+        self._open(temp_path)
+        self._walk(entries["id"].astype(np.int64) - 1, entries["key"], insert=True)
+        self.close()
+
+        os.replace(temp_path, self.path)
+        self._open()
+
+    def check_keys(self, values, keys):
+        """
+        Look up numeric IDs and card keys without changing anything.
+
+        Returns an array of NEW (ID free), REGISTERED (ID belongs to this card)
+        or COLLISION (ID belongs to another card).
+        """
+        return self._walk(np.asarray(values), np.asarray(keys, dtype=np.uint64), insert=False)
+
+    def contains(self, ids):
+        """
+        Returns a bool array saying which of the given ID strings have been issued.
+        """
+        values = decode_base36(ids)
+        # A key of 0 never matches a real card, so anything issued shows up as a collision
+        return self.check_keys(values, np.zeros(len(values), dtype=np.uint64)) != NEW
+
+    def register_keys(self, keys):
+        """
+        Issue IDs for an array of card keys, salting any that collide.
+
+        Returns:
+        - (values, salts): numeric uint32 IDs and the salt used for each card
+        """
+        unique_keys, inverse = np.unique(np.asarray(keys, dtype=np.uint64), return_inverse=True)
+        values = id_values_for_keys(unique_keys)
+        salts = np.zeros(len(unique_keys), dtype=np.uint8)
+
+        pending = np.arange(len(unique_keys))
+        while len(pending):
+            self._grow(len(pending))
+
+            status = self._walk(values[pending], unique_keys[pending], insert=True)
+            pending = pending[status == COLLISION]
+
+            salts[pending] += 1
+            if np.any(salts[pending] > MAX_SALT):
+                raise RuntimeError("Could not find a free ID after salting, the registry is close to full.")
+
+            for salt in np.unique(salts[pending]):
+                salted = pending[salts[pending] == salt]
+                values[salted] = id_values_for_keys(unique_keys[salted], salt)
+
+        return values[inverse.ravel()], salts[inverse.ravel()]
+
+    def register(self, health, attack, seed, card_type):
+        """
+        Issue IDs for arrays of card fields (card_type as integer codes).
+
+        Returns:
+        - (ids, salts): 6-character ID strings and the salt used for each card
+        """
+        values, salts = self.register_keys(card_keys(health, attack, seed, card_type))
+        return encode_base36(values), salts
@@ -0,0 +1,106 @@
+import json
+import sys
+import time
+
+
+class RunMetrics:
+    """
+    Lightweight counters for a generator run.
+
+    Hot loops should keep their own local counters and hand them over in bulk
+    (add_counts / add_group), only tick() is meant to be called per item. tick()
+    looks at the clock once every check_every items and prints a progress line
+    when report_every seconds have passed, so it costs next to nothing. finish()
+    returns a summary that write_json() emits as a single JSON line for the job
+    scheduler to pick up.
+
+    Parameters:
+    - name: Name of the run, included in the output
+    - total: Expected item count, if known, for the progress lines
+    - report_every: Seconds between progress lines, None for no progress output
+    - check_every: Items between clock checks
+    - stream: Where progress lines go
+    """
+
+    def __init__(self, name, total=None, report_every=5.0, check_every=1000, stream=sys.stderr):
+        self.name = name
+        self.total = total
+        self.report_every = report_every
+        self.check_every = check_every
+        self.stream = stream
+
+        self.items = 0
+        self.counts = {}
+        self.timings = {}
+        self.groups = {}
+
+        self.start = time.perf_counter()
+        self.elapsed = None
+        self._last_report = self.start
+        self._next_check = check_every
+
+    def tick(self, count=1):
+        self.items += count
+        if self.items >= self._next_check:
+            self._next_check = self.items + self.check_every
+            now = time.perf_counter()
+            if self.report_every is not None and now - self._last_report >= self.report_every:
+                self._last_report = now
+                self.report(now)
+
+    def count(self, key, amount=1):
+        self.counts[key] = self.counts.get(key, 0) + amount
+
+    def add_counts(self, counts):
+        for key, amount in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + amount
+
+    def add_time(self, key, seconds):
+        self.timings[key] = self.timings.get(key, 0.0) + seconds
+
+    def add_group(self, group, values):
+        """
+        Merge per key stats into a named group, e.g. add_group("patterns", {pattern: {"names": 10, "seconds": 0.2}}).
+        """
+        merged = self.groups.setdefault(group, {})
+        for key, stats in values.items():
+            target = merged.setdefault(key, {})
+            for stat, amount in stats.items():
+                target[stat] = target.get(stat, 0) + amount
+
+    def report(self, now=None):
+        elapsed = (now or time.perf_counter()) - self.start
+        rate = self.items / elapsed if elapsed else 0.0
+        done = f"{self.items}/{self.total}" if self.total else f"{self.items}"
+        print(f"[{self.name}] {done} items, {elapsed:.1f}s, {rate:,.0f}/s", file=self.stream, flush=True)
+
+    def finish(self):
+        """
+        Stop the clock and return the summary.
+        """
+        if self.elapsed is None:
+            self.elapsed = time.perf_counter() - self.start
+        return self.summary()
+
+    def summary(self):
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.start
+        return {
+            "name": self.name,
+            "items": self.items,
+            "elapsed": elapsed,
+            "items_per_sec": self.items / elapsed if elapsed else 0.0,
+            "counts": self.counts,
+            "timings": self.timings,
+            "groups": self.groups,
+        }
+
+    def write_json(self, path=None):
+        """
+        Write the summary as one JSON line to path, or to stdout if path is None.
+        """
+        line = json.dumps(self.finish(), separators=(",", ":"))
+        if path is None:
+            print(line, flush=True)
+        else:
+            with open(path, "w") as file:
+                file.write(line + "\n")
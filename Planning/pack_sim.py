@@ -0,0 +1,203 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from card_gen import PACK_SIZE, CardBatch, build_packs
+from metrics import RunMetrics
+from rarity import get_rarity_table
+from seeding import make_rng
+
+
+class PackSimResult:
+    """
+    Tallies from a pack simulation. Results from separate chunks are combined
+    with merge(), always in chunk order so the best card is picked the same way
+    however the chunks were spread over workers.
+    """
+
+    def __init__(self, rarity_labels):
+        self.rarity_labels = list(rarity_labels)
+        rarity_count = len(self.rarity_labels)
+
+        self.packs = 0
+        self.abilities = 0
+        self.rarity_counts = np.zeros(rarity_count, dtype=np.int64)
+        self.slot_counts = np.zeros((PACK_SIZE, rarity_count), dtype=np.int64)
+        self.packs_with = np.zeros(rarity_count, dtype=np.int64)
+        self.best_card = None
+        self.best_power = -np.inf
+        self.seed = None
+
+        # Seconds spent per generation step, summed over chunks (and so over workers)
+        self.timings = {}
+
+    @classmethod
+    def from_batch(cls, batch: CardBatch):
+        """
+        Tally a CardBatch holding whole packs, PACK_SIZE rows per pack in slot order.
+        """
+        result = cls(batch.rarity_table.labels)
+        rarity_count = len(result.rarity_labels)
+
+        codes = batch.rarity_code.reshape(-1, PACK_SIZE).astype(np.int64)
+        slots = np.arange(PACK_SIZE)
+
+        result.packs = len(codes)
+        result.abilities = int(np.count_nonzero(batch.has_ability))
+        result.rarity_counts = np.bincount(codes.ravel(), minlength=rarity_count)
+        result.slot_counts = np.bincount(
+            (slots * rarity_count + codes).ravel(), minlength=PACK_SIZE * rarity_count
+        ).reshape(PACK_SIZE, rarity_count)
+        result.packs_with = np.array([np.count_nonzero((codes == code).any(axis=1)) for code in range(rarity_count)])
+
+        if len(batch):
+            best = int(np.argmax(batch.power_rating))
+            result.best_card = batch.card(best)
+            result.best_power = float(batch.power_rating[best])
+
+        return result
+
+    @property
+    def cards(self):
+        return self.packs * PACK_SIZE
+
+    def merge(self, other):
+        self.packs += other.packs
+        self.abilities += other.abilities
+        self.rarity_counts += other.rarity_counts
+        self.slot_counts += other.slot_counts
+        self.packs_with += other.packs_with
+        for step, seconds in other.timings.items():
+            self.timings[step] = self.timings.get(step, 0.0) + seconds
+
+        if other.best_power > self.best_power:
+            self.best_power = other.best_power
+            self.best_card = other.best_card
+
+        return self
+
+    def odds(self):
+        """
+        Returns a dict of rarity -> (1-in-N cards, 1-in-N packs). None if it never came up.
+        """
+        return {
+            label: (
+                self.cards / self.rarity_counts[code] if self.rarity_counts[code] else None,
+                self.packs / self.packs_with[code] if self.packs_with[code] else None,
+            )
+            for code, label in enumerate(self.rarity_labels)
+        }
+
+    def report(self):
+        print(f"Packs: {self.packs}, Cards: {self.cards}, Seed: {self.seed}")
+        print(f"{self.abilities} Abilities / {self.cards} Cards [{self.abilities / max(self.cards, 1) * 100:.2f}]")
+        print("============================")
+
+        for code, (label, (card_odds, pack_odds)) in enumerate(self.odds().items()):
+            count = self.rarity_counts[code]
+            card_text = f"1-in-{round(card_odds)} cards" if card_odds else "never"
+            pack_text = f"1-in-{pack_odds:.1f} packs" if pack_odds else "never"
+            print(f"{label}: {count} [{count / max(self.cards, 1) * 100:.2f}%] {card_text}, {pack_text}")
+
+        print("")
+        print("Slot  " + "  ".join(f"{label:>10}" for label in self.rarity_labels))
+        for slot, counts in enumerate(self.slot_counts):
+            shares = counts / max(self.packs, 1) * 100
+            print(f"{slot:>4}  " + "  ".join(f"{share:>9.2f}%" for share in shares))
+
+        print("")
+        print(f"Best card: {self.best_card}")
+
+
+def simulate_chunk(seed_sequence, packs, rarity_table=None):
+    """
+    Simulate one chunk of packs from its own seed. Run inside the worker processes.
+    """
+    rng = make_rng(seed_sequence)
+
+    start = time.perf_counter()
+    health, attack = build_packs(packs, rng)
+    built = time.perf_counter()
+    batch = CardBatch(health.ravel(), attack.ravel(), rng, rarity_table)
+    batched = time.perf_counter()
+
+    result = PackSimResult.from_batch(batch)
+    result.timings = {
+        "build_packs": built - start,
+        "card_batch": batched - built,
+        "tally": time.perf_counter() - batched,
+    }
+    return result
+
+
+def simulate_packs(packs, seed=None, workers=None, chunk_size=10_000, rarity_table=None, metrics: RunMetrics = None):
+    """
+    Simulate opening a large number of packs across a process pool.
+
+    The packs are split into fixed size chunks and every chunk gets its own child
+    of SeedSequence(seed), so the result for a given seed and chunk_size is the
+    same no matter how many workers are used.
+
+    Parameters:
+    - packs: Number of packs to open
+    - seed: Seed for the whole run, a fresh one is picked (and stored on the result) if None
+    - workers: Number of worker processes, defaults to the CPU count. 1 runs in this process
+    - chunk_size: Packs per chunk
+    - rarity_table: RarityTable to classify with, the active one by default
+    - metrics: Optional RunMetrics, ticked with each finished chunk's packs and given the per step timings
+
+    Returns:
+    - A merged PackSimResult
+    """
+    rarity_table = rarity_table or get_rarity_table()
+    seed_sequence = np.random.SeedSequence(seed)
+
+    chunks = [chunk_size] * (packs // chunk_size)
+    if packs % chunk_size:
+        chunks.append(packs % chunk_size)
+
+    result = PackSimResult(rarity_table.labels)
+    result.seed = seed_sequence.entropy
+
+    def merge(chunk_result):
+        result.merge(chunk_result)
+        if metrics is not None:
+            metrics.tick(chunk_result.packs)
+
+    jobs = (seed_sequence.spawn(len(chunks)), chunks, repeat(rarity_table))
+    if workers == 1:
+        for chunk_result in map(simulate_chunk, *jobs):
+            merge(chunk_result)
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            for chunk_result in pool.map(simulate_chunk, *jobs):
+                merge(chunk_result)
+
+    if metrics is not None:
+        metrics.add_counts({"chunks": len(chunks), "cards": result.cards, "abilities": result.abilities})
+        for step, seconds in result.timings.items():
+            metrics.add_time(step, seconds)
+
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo booster pack simulation")
+    parser.add_argument("packs", type=int, nargs="?", default=1_000_000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    metrics = RunMetrics("pack_sim", total=args.packs, check_every=1)
+    result = simulate_packs(args.packs, seed=args.seed, workers=args.workers, chunk_size=args.chunk_size, metrics=metrics)
+    elapsed = metrics.finish()["elapsed"]
+
+    result.report()
+    print(f"{result.packs / elapsed:.0f} packs/s over {elapsed:.2f}s")
+
+    # Last line of stdout is the JSON summary for the job scheduler
+    metrics.write_json()
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class RarityTable:
+    """
+    Power rating thresholds for each rarity, lowest rarity first.
+
+    Rarities are handled as small integer codes (an index into labels) so whole
+    arrays of power ratings can be classified with one searchsorted call.
+
+    Parameters:
+    - labels: Rarity names, from most to least common
+    - thresholds: Minimum power rating for every label after the first
+    """
+
+    def __init__(self, labels, thresholds):
+        if len(thresholds) != len(labels) - 1:
+            raise ValueError("Need exactly one threshold per rarity above the first.")
+
+        self.labels = list(labels)
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+
+        if np.any(np.diff(self.thresholds) <= 0):
+            raise ValueError("Rarity thresholds must be strictly increasing.")
+
+        self._label_array = np.array(self.labels)
+
+    def classify(self, power_ratings):
+        """
+        Returns an array of uint8 rarity codes for an array of power ratings.
+        """
+        return np.searchsorted(self.thresholds, power_ratings, side="right").astype(np.uint8)
+
+    def categorize(self, power_rating):
+        """
+        Returns the rarity label for a single power rating.
+        """
+        code = 0
+        for threshold in self.thresholds:
+            if power_rating < threshold:
+                break
+            code += 1
+
+        return self.labels[code]
+
+    def label(self, code):
+        return self.labels[code]
+
+    def labels_for(self, codes):
+        """
+        Returns an array of rarity labels for an array of codes.
+        """
+        return self._label_array[codes]
+
+    def code(self, label):
+        return self.labels.index(label)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __repr__(self):
+        pairs = ", ".join(f"{label}>={threshold:g}" for label, threshold in zip(self.labels[1:], self.thresholds))
+        return f"RarityTable({self.labels[0]}, {pairs})"
+
+
+DEFAULT_RARITY_TABLE = RarityTable(
+    ["Common", "Uncommon", "Rare", "Ultra Rare", "Legendary"],
+    [106, 138, 170, 200],
+)
+
+_active_table = DEFAULT_RARITY_TABLE
+
+
+def get_rarity_table():
+    """
+    Returns the rarity table currently used for new cards.
+    """
+    return _active_table
+
+
+def set_rarity_table(table):
+    """
+    Swap the rarity table used for new cards (e.g. while tuning balance). Returns the previous table.
+    """
+    global _active_table
+    previous = _active_table
+    _active_table = table
+    return previous
+
+
+def categorize_rarity(power_rating):
+    return _active_table.categorize(power_rating)
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import shutil
+from collections import OrderedDict
+
+
+def render_key(card, background, template_version):
+    """
+    Digest of everything that ends up on a rendered card. Two cards with the same
+    key render to the same image, as long as the template version is bumped
+    whenever the layout or assets change.
+    """
+    fields = (
+        template_version,
+        background,
+        card.unique_card_id,
+        card.health,
+        card.primary_attack,
+        card.secondary_attack,
+        card.has_ability,
+        card.rarity,
+        card.card_type.name,
+    )
+    return hashlib.blake2b(repr(fields).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class RenderCache:
+    """
+    Disk cache of rendered card images, addressed by render_key.
+
+    Entries are kept as <cache_dir>/<first 2 hex digits>/<key>.png. Recency is
+    tracked in memory, and the least recently used entries are evicted once the
+    cache grows past max_bytes. Every put and hit also appends the key to
+    <cache_dir>/recent.log, which the next run replays to rebuild the order.
+    Cached files are hard linked to exported images, so their mtimes are never
+    touched and only order entries the journal doesn't mention. The journal
+    is compacted to one line per entry on load and whenever it grows well past
+    that.
+
+    Parameters:
+    - cache_dir: Folder to keep the cache in (created if needed)
+    - max_bytes: Size limit for the cache, None for no limit
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        # key -> file size, oldest use first
+        self._entries = OrderedDict()
+        self._journal_path = os.path.join(cache_dir, "recent.log")
+        self._journal = None
+        self._journal_lines = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        found = []
+        for bucket in os.scandir(cache_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.size += size
+
+        # Replay the journal over the mtime order, keys that were evicted since are skipped
+        if os.path.exists(self._journal_path):
+            with open(self._journal_path) as journal:
+                for line in journal:
+                    key = line.strip()
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+
+        self._compact_journal()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns the path of the cached image, or None on a miss.
+        """
+        if key not in self._entries:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        self._record_use(key)
+        return self.path(key)
+
+    def put(self, key, data):
+        """
+        Store encoded image bytes under key and return the cached file's path.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+        self.size += len(data) - self._entries.pop(key, 0)
+        self._entries[key] = len(data)
+        self._record_use(key)
+        self.evict()
+        return path
+
+    def _record_use(self, key):
+        self._journal.write(key + "\n")
+        self._journal_lines += 1
+        if self._journal_lines > 4 * len(self._entries) + 1000:
+            self._compact_journal()
+
+    def _compact_journal(self):
+        # Rewrite the journal as the current order, one line per entry, oldest use first
+        if self._journal is not None:
+            self._journal.close()
+
+        temp_path = self._journal_path + ".tmp"
+        with open(temp_path, "w") as journal:
+            journal.writelines(key + "\n" for key in self._entries)
+        os.replace(temp_path, self._journal_path)
+
+        self._journal = open(self._journal_path, "a", buffering=1)
+        self._journal_lines = len(self._entries)
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def evict(self):
+        """
+        Drop least recently used entries until the cache fits in max_bytes.
+        """
+        if self.max_bytes is None:
+            return
+
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+            self.size -= size
+
+    def export(self, key, filename):
+        """
+        Put the cached image for key at filename, hard linked where possible.
+
+        Returns False if filename already was that exact file, True otherwise.
+        """
+        path = self.path(key)
+        if os.path.exists(filename):
+            if os.path.samefile(path, filename):
+                return False
+            os.remove(filename)
+
+        try:
+            os.link(path, filename)
+        except OSError:
+            shutil.copyfile(path, filename)
+
+        return True
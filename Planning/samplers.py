@@ -0,0 +1,206 @@
+import math
+
+import numpy as np
+
+from seeding import make_rng
+
+# Bounded stat samplers. Every one of them maps a block of uniforms through an
+# inverse CDF, so they draw exactly `size` values in one pass with no rejection
+# loop, whatever the bounds are.
+
+# Acklam's rational approximation of the inverse normal CDF (relative error < 1.2e-9)
+_PPF_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+          1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_PPF_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+          6.680131188771972e+01, -1.328068155288572e+01)
+_PPF_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+          -2.549671010243949e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_PPF_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+          3.754408661907416e+00)
+_PPF_TAIL = 0.02425
+
+# Smallest and largest uniforms passed to an inverse CDF, so it never sees exactly 0 or 1
+_TINY = np.nextafter(0.0, 1.0)
+_BELOW_ONE = np.nextafter(1.0, 0.0)
+
+
+def _normal_cdf(z):
+    return 0.5 * math.erfc(-z / math.sqrt(2))
+
+
+def _normal_ppf(p):
+    """
+    Inverse of the standard normal CDF for an array of probabilities in (0, 1).
+    """
+    p = np.asarray(p, dtype=np.float64)
+    x = np.empty_like(p)
+
+    # Tails, the upper one mirrored onto the lower one
+    tail = np.minimum(p, 1 - p)
+    in_tail = tail < _PPF_TAIL
+    q = np.sqrt(-2 * np.log(tail[in_tail]))
+    c, d = _PPF_C, _PPF_D
+    tail_x = (((((c[0] * q + c[1]) * q + c[2]) * q + c[3]) * q + c[4]) * q + c[5]) / \
+             ((((d[0] * q + d[1]) * q + d[2]) * q + d[3]) * q + 1)
+    x[in_tail] = np.where(p[in_tail] < 0.5, tail_x, -tail_x)
+
+    q = p[~in_tail] - 0.5
+    r = q * q
+    a, b = _PPF_A, _PPF_B
+    x[~in_tail] = (((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5]) * q / \
+                  (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1)
+    return x
+
+
+def _uniform_between(rng, size, low, high):
+    # Uniforms in [low, high], kept off exactly 0 and 1
+    return np.clip(low + (high - low) * rng.random(size), _TINY, _BELOW_ONE)
+
+
+def _bound(low, default):
+    return default if low is None else low
+
+
+def truncated_normal_stats(size, mean=50, std_dev=15, low=None, high=None, rng=None):
+    """
+    Normal distribution cut off at low and/or high.
+
+    Parameters:
+    - size: Number of values (or an array shape)
+    - mean: The mean of the untruncated distribution
+    - std_dev: The standard deviation of the untruncated distribution
+    - low: Smallest value allowed, None for no lower bound
+    - high: Largest value allowed, None for no upper bound
+    - rng: numpy Generator or seed to draw from
+
+    Returns:
+    - Array of values in [low, high]
+    """
+    rng = make_rng(rng)
+    z_low = (_bound(low, -np.inf) - mean) / std_dev
+    z_high = (_bound(high, np.inf) - mean) / std_dev
+    if z_low > z_high:
+        raise ValueError("low must not be above high.")
+
+    if z_low > 0:
+        # All of the range is in the upper tail, sample the mirrored lower tail where the CDF keeps its precision
+        z = -_normal_ppf(_uniform_between(rng, size, _normal_cdf(-z_high), _normal_cdf(-z_low)))
+    else:
+        z = _normal_ppf(_uniform_between(rng, size, _normal_cdf(z_low), _normal_cdf(z_high)))
+
+    return np.clip(mean + std_dev * z, _bound(low, -np.inf), _bound(high, np.inf))
+
+
+def truncated_logistic_stats(size, mean=50, scale=8, low=None, high=None, rng=None):
+    """
+    Logistic distribution cut off at low and/or high.
+
+    Parameters:
+    - size: Number of values (or an array shape)
+    - mean: Center of the distribution
+    - scale: Logistic scale (std_dev / 1.813)
+    - low: Smallest value allowed, None for no lower bound
+    - high: Largest value allowed, None for no upper bound
+    - rng: numpy Generator or seed to draw from
+
+    Returns:
+    - Array of values in [low, high]
+    """
+    rng = make_rng(rng)
+    low, high = _bound(low, -np.inf), _bound(high, np.inf)
+    if low > high:
+        raise ValueError("low must not be above high.")
+
+    # CDF is 1 / (1 + exp(-(x - mean) / scale)), its inverse is mean + scale * logit(p)
+    cdf_low, cdf_high = (1 / (1 + np.exp(-(np.array([low, high]) - mean) / scale))).tolist()
+    p = _uniform_between(rng, size, cdf_low, cdf_high)
+    return np.clip(mean + scale * np.log(p / (1 - p)), low, high)
+
+
+def sigmoid_stats(size, low=0, high=100, k=10, rng=None):
+    """
+    Uniform draws in [-1, 1] pushed through a sigmoid of steepness k and rescaled
+    so -1 and 1 land exactly on low and high. A small k gives a near uniform
+    spread, a large k piles values up at both ends.
+
+    Parameters:
+    - size: Number of values (or an array shape)
+    - low: Smallest possible value
+    - high: Largest possible value
+    - k: Steepness of the sigmoid (higher = more extreme values)
+    - rng: numpy Generator or seed to draw from
+
+    Returns:
+    - Array of values in [low, high]
+    """
+    if k <= 0:
+        raise ValueError("k must be positive.")
+
+    rng = make_rng(rng)
+    x = rng.uniform(-1, 1, size)
+
+    # tanh(k x / 2) is 2 * sigmoid(k x) - 1, normalised by its value at x = 1
+    curve = np.tanh(k * x / 2) / np.tanh(k / 2)
+    return low + (high - low) * (curve + 1) / 2
+
+
+def _truncate_histogram(points, weights, low, high):
+    # Drop the mass outside [low, high]. Values outside lose their weight, bins are cut
+    # at the bounds and keep the share of their count that was inside
+    if len(points) == len(weights):
+        return points, np.where((points >= low) & (points <= high), weights, 0.0)
+
+    widths = np.diff(points)
+    points = np.clip(points, low, high)
+    inside = np.divide(np.diff(points), widths, out=np.zeros_like(widths), where=widths > 0)
+    return points, weights * inside
+
+
+def empirical_stats(size, histogram, rng=None, low=None, high=None):
+    """
+    Sample from a target histogram through its inverse CDF.
+
+    histogram is (values, weights) or (edges, counts):
+    - values, weights of the same length: each value is picked with its weight
+    - edges one longer than counts: a value is picked uniformly within a bin
+      chosen by its count, as np.histogram would have binned it
+
+    With low and/or high the histogram is truncated before sampling, so the
+    values keep the histogram's shape inside the bounds.
+
+    Parameters:
+    - size: Number of values (or an array shape)
+    - histogram: (values, weights) or (edges, counts), see above
+    - rng: numpy Generator or seed to draw from
+    - low: Smallest value allowed, None for no lower bound
+    - high: Largest value allowed, None for no upper bound
+
+    Returns:
+    - Array of values
+    """
+    points, weights = (np.asarray(part, dtype=np.float64) for part in histogram)
+    if len(points) not in (len(weights), len(weights) + 1):
+        raise ValueError("histogram must be (values, weights) or (edges, counts).")
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError("histogram weights must be non-negative with a positive total.")
+
+    if low is not None or high is not None:
+        low, high = _bound(low, -np.inf), _bound(high, np.inf)
+        if low > high:
+            raise ValueError("low must not be above high.")
+        points, weights = _truncate_histogram(points, weights, low, high)
+        if not weights.sum() > 0:
+            raise ValueError("The histogram has no weight between low and high.")
+
+    rng = make_rng(rng)
+    cdf = np.cumsum(weights) / weights.sum()
+    u = rng.random(size)
+    index = np.minimum(np.searchsorted(cdf, u, side="right"), len(weights) - 1)
+
+    if len(points) == len(weights):
+        return points[index]
+
+    # Position of u within its bin's slice of the CDF, mapped onto the bin's width
+    cdf_start = np.concatenate([[0.0], cdf[:-1]])
+    within = (u - cdf_start[index]) / (cdf[index] - cdf_start[index])
+    return points[index] + np.clip(within, 0, 1) * (points[index + 1] - points[index])
@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+
+# Shared Generator and BulkRandom for callers that don't pass one, made on first use
+_default_rng = None
+_default_bulk_random = None
+
+
+def get_default_rng():
+    """
+    The process wide Generator, seeded from OS entropy the first time it's asked for.
+
+    Meant for scalar code like Card() that would otherwise seed a new Generator
+    per call. Forked children start a fresh one, so workers never repeat each
+    other's draws.
+    """
+    global _default_rng
+    if _default_rng is None:
+        _default_rng = np.random.Generator(np.random.PCG64())
+    return _default_rng
+
+
+def get_default_bulk_random():
+    """
+    The process wide BulkRandom, drawing its blocks from get_default_rng().
+
+    Unseeded scalar calls like parse_pattern() use it, so they hand out values
+    from one block instead of seeding and filling a new one per call.
+    """
+    global _default_bulk_random
+    if _default_bulk_random is None:
+        _default_bulk_random = BulkRandom(get_default_rng())
+    return _default_bulk_random
+
+
+def _reset_default_rng():
+    global _default_rng, _default_bulk_random
+    _default_rng = None
+    _default_bulk_random = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_default_rng)
+
+
+def make_rng(seed=None):
+    """
+    Get a numpy Generator for a seed.
+
+    Parameters:
+    - seed: A Generator (returned as is), a SeedSequence, an int, or None for fresh OS entropy
+
+    Returns:
+    - A numpy Generator
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return np.random.Generator(np.random.PCG64(seed))
+
+
+def spawn_rngs(seed, count):
+    """
+    Independent child Generators of a seed, e.g. one per chunk of work. Children
+    depend only on the seed and their position, not on which process uses them.
+
+    Parameters:
+    - seed: A Generator, SeedSequence, int or None
+    - count: Number of Generators to make
+
+    Returns:
+    - List of numpy Generators
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed.spawn(count)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [np.random.Generator(np.random.PCG64(child)) for child in seed.spawn(count)]
+
+
+class BulkRandom:
+    """
+    random()/choice() source for scalar code, backed by a numpy Generator.
+
+    Uniforms are drawn from the Generator in blocks of block_size and handed out
+    one at a time, so loops that need a few random picks per item (like pattern
+    rendering) don't pay for a numpy call on every pick. Every pick uses exactly
+    one uniform and each double comes from one 64 bit draw, so the values handed
+    out don't depend on block_size.
+
+    Parameters:
+    - rng: A Generator, SeedSequence, int seed or None
+    - block_size: Uniforms drawn per refill
+    """
+
+    def __init__(self, rng=None, block_size=8192):
+        self.rng = make_rng(rng)
+        self.block_size = block_size
+        self._block = []
+        self._position = 0
+
+    def random(self):
+        if self._position == len(self._block):
+            self._block = self.rng.random(self.block_size).tolist()
+            self._position = 0
+
+        value = self._block[self._position]
+        self._position += 1
+        return value
+
+    def choice(self, sequence):
+        """
+        Pick a uniformly random item from anything with len() and indexing.
+        """
+        return sequence[int(self.random() * len(sequence))]
+
+
+def bulk_random(rng=None):
+    """
+    Wrap a Generator or seed in a BulkRandom, BulkRandoms are returned as is and
+    None gives the shared default one.
+    """
+    if rng is None:
+        return get_default_bulk_random()
+    return rng if isinstance(rng, BulkRandom) else BulkRandom(rng)
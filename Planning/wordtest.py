@@ -1,6 +1,12 @@
-import random
+import gzip
+import hashlib
+import math
 import re
-from tqdm import tqdm
+import sys
+import time
+
+from metrics import RunMetrics
+from seeding import bulk_random
 
 # Word lists for different tags
 word_lists = {
@@ -596,37 +602,121 @@ word_lists = {
     ]
 }
 
-def parse_pattern(pattern, word_lists):
-    def replace_match(match):
-        # Extract content within brackets
-        content = match.group(1)
-        selected_tag = content
-        
-        # Handle optional parts with percentage chance
-        if ":" in content:
-            tag, chance = content.split(":")
-            chance = int(chance.strip('%'))
-            if random.randint(1, 100) > chance:
-                return ""  # Skip this part
-            else:
-                selected_tag = tag
-                #print(f"Trying to add adj of: {selected_tag}")
-
-        # Handle multiple options with `|`
-        if "|" in content:
-            tags = content.split("|")
-            selected_tag = random.choice(tags)
-        
-        # Select a random word from the appropriate list
-        if selected_tag in word_lists:
-            return random.choice(word_lists[selected_tag])
-        
-        #print("Returned selected tag: " + f"[{selected_tag}]")
-        return f"[{selected_tag}]"  # Return unprocessed if tag not found
-
-    # Replace all placeholders in the pattern
-    replaced = re.sub(r'\[([^\]]+)\]', replace_match, pattern)
-    return replaced.replace("  ", " ")
+class CombinedWords:
+    """
+    Every prefix + suffix combination of two word lists, built on demand.
+
+    Behaves like a read only list of the full cross product (len(), indexing and
+    iteration all work, so BulkRandom.choice can pick from it) without ever storing
+    the combined strings. Index i maps to prefixes[i // len(suffixes)] +
+    suffixes[i % len(suffixes)], the same order as a nested loop would give.
+    """
+
+    def __init__(self, prefixes, suffixes):
+        self.prefixes = prefixes
+        self.suffixes = suffixes
+
+    def __len__(self):
+        return len(self.prefixes) * len(self.suffixes)
+
+    def __getitem__(self, index):
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("CombinedWords index out of range")
+
+        prefix, suffix = divmod(index, len(self.suffixes))
+        return self.prefixes[prefix] + self.suffixes[suffix]
+
+    def choice(self, rng=None):
+        """
+        Pick a uniformly random combination.
+
+        Parameters:
+        - rng: BulkRandom, numpy Generator or seed to draw from, None for the shared default one
+        """
+        rng = bulk_random(rng)
+        return rng.choice(self.prefixes) + rng.choice(self.suffixes)
+
+
+_slot_regex = re.compile(r'\[([^\]]+)\]')
+
+
+class PatternTemplate:
+    """
+    A pattern compiled once into literal text and pre-resolved slots.
+
+    Each slot is stored as (literal before the slot, chance to include, candidate
+    word lists) so rendering is just a walk over the slots with no regex or
+    string splitting. Candidate lists are references into word_lists, so the
+    word lists must be complete before the pattern is compiled.
+    """
+
+    def __init__(self, pattern, word_lists):
+        self.pattern = pattern
+        self.slots = []
+
+        position = 0
+        for match in _slot_regex.finditer(pattern):
+            literal = pattern[position:match.start()]
+            position = match.end()
+
+            content = match.group(1)
+            chance = None
+
+            # Handle optional parts with percentage chance
+            if ":" in content:
+                content, chance = content.split(":")
+                chance = int(chance.strip('%')) / 100
+
+            # Handle multiple options with `|`. Unknown tags are left in the output as is
+            candidates = tuple(
+                word_lists[tag] if tag in word_lists else [f"[{tag}]"]
+                for tag in content.split("|")
+            )
+
+            self.slots.append((literal, chance, candidates))
+
+        self.tail = pattern[position:]
+
+    def render(self, rng=None):
+        """
+        Fill in the pattern.
+
+        Parameters:
+        - rng: BulkRandom to draw from, a numpy Generator or seed gets wrapped in one.
+          Pass the same BulkRandom for every render in a loop, None uses the shared default one.
+        """
+        rng = bulk_random(rng)
+
+        parts = []
+        for literal, chance, candidates in self.slots:
+            parts.append(literal)
+
+            if chance is not None and rng.random() >= chance:
+                continue  # Skip this part
+
+            words = candidates[0] if len(candidates) == 1 else rng.choice(candidates)
+            parts.append(rng.choice(words))
+
+        parts.append(self.tail)
+        return "".join(parts).replace("  ", " ")
+
+    def __repr__(self):
+        return f"PatternTemplate({self.pattern!r})"
+
+
+def compile_patterns(patterns, word_lists):
+    """
+    Compile a list of pattern strings into PatternTemplates.
+    """
+    return [PatternTemplate(pattern, word_lists) for pattern in patterns]
+
+
+def parse_pattern(pattern, word_lists, rng=None):
+    # Kept for one-off use, bulk jobs should compile the pattern once and call render()
+    return PatternTemplate(pattern, word_lists).render(rng)
 
 # Example patterns
 patterns = [
@@ -638,26 +728,297 @@ patterns = [
 ]
 
 
-fictional_words = []
+word_lists["fictional_words"] = CombinedWords(word_lists["first_parts"], word_lists["second_parts"])
+
+
+class NameRegistry:
+    """
+    Ordered collection of unique names.
+
+    Membership is checked against a set so each insert is O(1), the list keeps
+    the names in the order they were generated. Retry counts are tracked per
+    pattern so we can see which patterns are running out of space.
+    """
+
+    def __init__(self):
+        self.names = []
+        self._seen = set()
+        self.attempts = {}
+        self.retries = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._seen
+
+    def add(self, name, pattern=None):
+        """
+        Try to add a name. Returns True if it was new, False if it was a duplicate.
+        """
+        self.attempts[pattern] = self.attempts.get(pattern, 0) + 1
+
+        if name in self._seen:
+            self.retries[pattern] = self.retries.get(pattern, 0) + 1
+            return False
+
+        self._seen.add(name)
+        self.names.append(name)
+        return True
+
+    def retry_rates(self):
+        """
+        Returns a dict of pattern -> fraction of attempts that were duplicates.
+        """
+        return {
+            pattern: self.retries.get(pattern, 0) / attempts
+            for pattern, attempts in self.attempts.items()
+        }
+
+
+class BloomFilter:
+    """
+    Fixed size set membership filter for strings.
+
+    Uses a fixed amount of memory however many items go in. It never forgets an
+    item it has seen, but may (at roughly error_rate once `capacity` items are in)
+    claim to have seen one it hasn't.
+
+    Parameters:
+    - capacity: Number of items the filter is sized for
+    - error_rate: Target false positive rate at capacity
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item):
+        """
+        Add an item. Returns True if it was definitely new, False if it may have been seen before.
+        """
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+
+        bits = self.bits
+        new = False
+        for i in range(self.hash_count):
+            position = (first + i * step) % self.size
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+
+        return new
+
+
+class BoundedNameRegistry:
+    """
+    Tracks which names have been used without keeping the names themselves.
+
+    Names are checked against an exact set until there are exact_limit of them,
+    then everything moves into a BloomFilter sized for `capacity` and memory stops
+    growing. Either way no duplicate ever gets through, the filter only costs the
+    odd extra retry when it mistakes a new name for an old one.
+
+    Parameters:
+    - capacity: Roughly how many names the run will produce
+    - error_rate: Bloom filter false positive rate at capacity
+    - exact_limit: Names kept in an exact set before switching to the Bloom filter
+    """
+
+    def __init__(self, capacity, error_rate=0.001, exact_limit=1_000_000):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.exact_limit = exact_limit
+        self.count = 0
+        self.attempts = {}
+        self.retries = {}
+
+        self._exact = set()
+        self._bloom = None
+
+    def __len__(self):
+        return self.count
+
+    def add(self, name, pattern=None):
+        """
+        Try to add a name. Returns True if it was new, False if it was (or may have been) a duplicate.
+        """
+        self.attempts[pattern] = self.attempts.get(pattern, 0) + 1
+
+        if self._exact is not None:
+            new = name not in self._exact
+            if new:
+                self._exact.add(name)
+                if len(self._exact) > self.exact_limit:
+                    self._switch_to_bloom()
+        else:
+            new = self._bloom.add(name)
+
+        if not new:
+            self.retries[pattern] = self.retries.get(pattern, 0) + 1
+            return False
+
+        self.count += 1
+        return True
+
+    def _switch_to_bloom(self):
+        self._bloom = BloomFilter(max(self.capacity, self.exact_limit * 2), self.error_rate)
+        for name in self._exact:
+            self._bloom.add(name)
+        self._exact = None
+
+    def retry_rates(self):
+        """
+        Returns a dict of pattern -> fraction of attempts that were duplicates.
+        """
+        return {
+            pattern: self.retries.get(pattern, 0) / attempts
+            for pattern, attempts in self.attempts.items()
+        }
+
+
+def iter_names(count, patterns, word_lists, registry, max_retries=1000, metrics=None, rng=None):
+    """
+    Yield `count` names, each of which the registry accepted as new.
+
+    Parameters:
+    - count: Number of unique names to produce
+    - patterns: List of PatternTemplates (or pattern strings, which get compiled)
+    - word_lists: Tag -> word list mapping used by the patterns
+    - registry: NameRegistry or BoundedNameRegistry that decides what is a duplicate
+    - max_retries: Duplicates allowed in a row for one pattern before giving up
+    - metrics: Optional RunMetrics, ticked per name and given per pattern names, retries and seconds
+    - rng: numpy Generator, seed or BulkRandom to draw from. The same seed gives the same names in the same order
+    """
+    draws = bulk_random(rng)
+    templates = [
+        pattern if isinstance(pattern, PatternTemplate) else PatternTemplate(pattern, word_lists)
+        for pattern in patterns
+    ]
+
+    # pattern -> [names, retries, seconds], kept locally and handed to metrics once at the end
+    pattern_stats = {template.pattern: [0, 0, 0.0] for template in templates}
+    clock = time.perf_counter
+
+    try:
+        for _ in range(count):
+            template = draws.choice(templates)
+            start = clock()
+
+            retries = 0
+            name = template.render(draws)
+            while not registry.add(name, template.pattern):
+                retries += 1
+                if retries > max_retries:
+                    raise RuntimeError(f"Pattern '{template.pattern}' ran out of unique names after {len(registry)} names")
+                name = template.render(draws)
+
+            stats = pattern_stats[template.pattern]
+            stats[0] += 1
+            stats[1] += retries
+            stats[2] += clock() - start
+
+            if metrics is not None:
+                metrics.tick()
+            yield name
+    finally:
+        if metrics is not None:
+            metrics.count("retries", sum(stats[1] for stats in pattern_stats.values()))
+            metrics.add_group("patterns", {
+                pattern: {"names": names, "retries": retries, "seconds": seconds}
+                for pattern, (names, retries, seconds) in pattern_stats.items()
+                if names or retries
+            })
+
+
+def generate_names(count, patterns, word_lists, max_retries=1000, registry=None, metrics=None, rng=None):
+    """
+    Generate `count` unique names from the given patterns, keeping them all in memory.
+
+    Parameters:
+    - count: Number of unique names to produce
+    - patterns: List of PatternTemplates (or pattern strings, which get compiled)
+    - word_lists: Tag -> word list mapping used by the patterns
+    - max_retries: Duplicates allowed in a row for one pattern before giving up
+    - registry: Optional NameRegistry to add to (a new one is made otherwise)
+    - metrics: Optional RunMetrics to record progress and per pattern stats in
+    - rng: numpy Generator or seed to draw from
+
+    Returns:
+    - The NameRegistry holding the generated names
+    """
+    if registry is None:
+        registry = NameRegistry()
+
+    for _ in iter_names(count, patterns, word_lists, registry, max_retries, metrics, rng):
+        pass
+
+    return registry
+
+
+def write_names(filename, count, patterns, word_lists, registry=None, chunk_size=10_000, max_retries=1000, metrics=None,
+                rng=None):
+    """
+    Generate `count` unique names straight into a file, in constant memory.
+
+    Names are written in chunks of chunk_size lines. A filename ending in .gz is
+    written gzip compressed.
+
+    Parameters:
+    - filename: File to write, one name per line
+    - count: Number of unique names to produce
+    - patterns: List of PatternTemplates (or pattern strings, which get compiled)
+    - word_lists: Tag -> word list mapping used by the patterns
+    - registry: Optional registry, a BoundedNameRegistry sized for `count` by default
+    - chunk_size: Names per write
+    - max_retries: Duplicates allowed in a row for one pattern before giving up
+    - metrics: Optional RunMetrics to record progress, per pattern stats and write time in
+    - rng: numpy Generator or seed to draw from
+
+    Returns:
+    - The registry, for its retry stats
+    """
+    if registry is None:
+        registry = BoundedNameRegistry(count)
+
+    opener = gzip.open if filename.endswith(".gz") else open
+    write_seconds = 0.0
+    with opener(filename, "wt", encoding="utf-8") as file:
+        chunk = []
+        for name in iter_names(count, patterns, word_lists, registry, max_retries, metrics, rng):
+            chunk.append(name)
+            if len(chunk) >= chunk_size:
+                start = time.perf_counter()
+                file.write("\n".join(chunk) + "\n")
+                write_seconds += time.perf_counter() - start
+                chunk.clear()
+
+        if chunk:
+            start = time.perf_counter()
+            file.write("\n".join(chunk) + "\n")
+            write_seconds += time.perf_counter() - start
 
-for part in word_lists["first_parts"]:
-    for second in word_lists["second_parts"]:
-        fictional_words.append(f"{part}{second}")
+    if metrics is not None:
+        metrics.add_time("write", write_seconds)
 
-word_lists["fictional_words"] = fictional_words
+    return registry
 
 
-names = []
+if __name__ == "__main__":
+    NAME_COUNT = 200000
+    NAME_SEED = None  # Set to an int to get the same names.txt every run
 
-for _ in tqdm(range(200000)):  # Generate 10 examples
-    pattern = random.choice(patterns)
-    #print(parse_pattern(pattern, word_lists))
-    name = parse_pattern(pattern, word_lists) + '\n'
-    while name in names:
-        name = parse_pattern(pattern, word_lists) + '\n'
+    templates = compile_patterns(patterns, word_lists)
 
-    names.append(name)
+    metrics = RunMetrics("names", total=NAME_COUNT)
+    registry = write_names('names.txt', NAME_COUNT, templates, word_lists, metrics=metrics, rng=NAME_SEED)
 
-with open('names.txt', 'w+') as file:
-    file.writelines(names)
+    for pattern, rate in registry.retry_rates().items():
+        print(f"{rate * 100:6.2f}% retries: {pattern}", file=sys.stderr)
 
+    # Last line of stdout is the JSON summary for the job scheduler
+    metrics.write_json()